@@ -3,48 +3,84 @@ Simple FastAPI app that serves both API and frontend redirect
 This approach works better with Render's deployment system
 """
 import os
-from fastapi import FastAPI, HTTPException, Depends, status
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, RedirectResponse
-from pydantic import BaseModel, EmailStr
-from typing import List, Optional
+import asyncio
+from fastapi import Header
+from fastapi.responses import HTMLResponse
+from fastapi.concurrency import run_in_threadpool
+from typing import Optional
 import uvicorn
 from datetime import datetime, timedelta
-import jwt
-import hashlib
-import secrets
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, ForeignKey, Boolean
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session, relationship
-import logging
+from sqlalchemy import select, func
 
-# Import all the models and functions from main.py
-from main import *
+# Build the API from main.py (routes, middleware, /metrics, startup hooks) rather than a second
+# copy, leaving out its JSON root for the landing page and adding /status
+from main import create_app, SessionLocal, User, Product, Order, logger
+from compression import PrecompressedContent
 
-# Create the app with additional endpoints
-app = FastAPI(
+app = create_app(
     title="E-commerce Full Stack Application",
     description="Complete e-commerce solution with API and frontend integration",
-    version="2.0.0"
+    version="2.0.0",
+    json_root=False
 )
 
-# CORS middleware - allow all origins for demo
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+STATUS_REFRESH_INTERVAL = float(os.getenv("STATUS_REFRESH_INTERVAL", "30"))
 
-# All existing routes from main.py are already included via import
+class StatusCounts:
+    """Table row counts for /status, refreshed in the background instead of on every hit."""
 
-# Add a frontend landing page
-@app.get("/", response_class=HTMLResponse)
-def frontend_landing():
-    """Landing page with frontend information"""
-    html_content = f"""
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.counts = None
+        self.refreshed_at = None
+        self.error = None
+        self._task = None
+
+    def refresh(self):
+        """Count users, products and orders in a single round trip."""
+        try:
+            with SessionLocal() as db:
+                row = db.execute(select(
+                    select(func.count()).select_from(User).scalar_subquery(),
+                    select(func.count()).select_from(Product).scalar_subquery(),
+                    select(func.count()).select_from(Order).scalar_subquery(),
+                )).one()
+        except Exception as e:
+            self.error = str(e)
+            logger.warning(f"Status counts refresh failed: {e}")
+            return
+        self.counts = {"users": row[0], "products": row[1], "orders": row[2]}
+        self.refreshed_at = datetime.utcnow()
+        self.error = None
+
+    async def _refresh_forever(self):
+        while True:
+            await run_in_threadpool(self.refresh)
+            await asyncio.sleep(self.interval)
+
+    async def start(self):
+        # The first count also runs in the background: full-table COUNT(*)s must not hold up
+        # startup, and /status reports the database as "starting" until they finish
+        self._task = asyncio.create_task(self._refresh_forever())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+status_counts = StatusCounts(STATUS_REFRESH_INTERVAL)
+
+@app.on_event("startup")
+async def start_status_counts():
+    await status_counts.start()
+
+@app.on_event("shutdown")
+async def stop_status_counts():
+    await status_counts.stop()
+
+def render_landing_page():
+    """Render the landing page HTML"""
+    return f"""
     <!DOCTYPE html>
     <html>
     <head>
@@ -210,49 +246,54 @@ def frontend_landing():
     </body>
     </html>
     """
-    return HTMLResponse(content=html_content)
+
+# The landing page is static for the life of the process, so render and compress it once
+LANDING_PAGE = PrecompressedContent(render_landing_page(), media_type="text/html; charset=utf-8")
+
+# Add a frontend landing page
+@app.get("/", response_class=HTMLResponse)
+def frontend_landing(accept_encoding: Optional[str] = Header(None)):
+    """Landing page with frontend information"""
+    return LANDING_PAGE.response(accept_encoding)
 
 # Enhanced health check with more information
 @app.get("/status")
 def detailed_status():
-    """Detailed application status"""
-    try:
-        # Test database connection
-        db = SessionLocal()
-        user_count = db.query(User).count()
-        product_count = db.query(Product).count()
-        order_count = db.query(Order).count()
-        db.close()
-        
-        return {
-            "status": "healthy",
-            "timestamp": datetime.utcnow().isoformat(),
-            "environment": "production",
-            "database": {
-                "status": "connected",
-                "users": user_count,
-                "products": product_count,
-                "orders": order_count
-            },
-            "api": {
-                "version": "2.0.0",
-                "docs_url": "/docs",
-                "health_url": "/health"
-            },
-            "features": [
-                "User Authentication",
-                "Product Management", 
-                "Order Processing",
-                "Database Integration",
-                "API Documentation"
-            ]
-        }
-    except Exception as e:
-        return {
-            "status": "error",
-            "timestamp": datetime.utcnow().isoformat(),
-            "error": str(e)
-        }
+    """Detailed application status, served from counts refreshed every STATUS_REFRESH_INTERVAL seconds"""
+    # Until the first background count lands the counts are null; that is startup, not a failure
+    counts = status_counts.counts or {"users": None, "products": None, "orders": None}
+    refreshed_at = status_counts.refreshed_at
+    if status_counts.error is not None:
+        database_status = "error"
+    elif refreshed_at is None:
+        database_status = "starting"
+    else:
+        database_status = "connected"
+    
+    return {
+        "status": "error" if status_counts.error is not None else "healthy",
+        "timestamp": datetime.utcnow().isoformat(),
+        "environment": "production",
+        "database": {
+            "status": database_status,
+            **counts,
+            "refreshed_at": refreshed_at.isoformat() if refreshed_at else None,
+            "stale_after": (refreshed_at + timedelta(seconds=status_counts.interval)).isoformat() if refreshed_at else None,
+            **({"error": status_counts.error} if status_counts.error else {})
+        },
+        "api": {
+            "version": "2.0.0",
+            "docs_url": "/docs",
+            "health_url": "/health"
+        },
+        "features": [
+            "User Authentication",
+            "Product Management", 
+            "Order Processing",
+            "Database Integration",
+            "API Documentation"
+        ]
+    }
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8000))
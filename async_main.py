@@ -0,0 +1,307 @@
+"""
+Async variant of the E-commerce API (benchmark only, do not deploy)
+Serves the core auth, product and order routes of main.py from an
+AsyncEngine/AsyncSession so requests are not capped by Starlette's threadpool.
+Works on SQLite (aiosqlite) and PostgreSQL (asyncpg).
+
+It exists to compare the two request paths (benchmarks/bench_async.py) and is a
+subset of main.py: no Idempotency-Key handling (retried checkouts can create
+duplicate orders), /products/page, search, /categories, /orders/batch, exports,
+/metrics or ETag/304. Stock reservation and token checks are shared with main.py;
+the routes are not. Deploy main:app or app:app.
+
+Run with: uvicorn async_main:app --port 8000
+"""
+import os
+from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi.security import HTTPAuthorizationCredentials
+from fastapi.middleware.cors import CORSMiddleware
+from typing import List
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+import uvicorn
+from datetime import datetime, timedelta
+from db_pool import pool_options, pool_status
+from sqlalchemy import select, insert
+from sqlalchemy.orm import selectinload
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+# Reuse models, schemas and auth helpers from the sync app
+from main import (
+    DATABASE_URL, ACCESS_TOKEN_EXPIRE_MINUTES,
+    User, Product, Order, OrderItem, category_stats_upsert, reserve_stock_statement, sold_out_upsert,
+    UserCreate, UserResponse, ProductCreate, ProductResponse,
+    OrderCreate, OrderItemResponse, OrderResponse, Token,
+    security, create_access_token, decode_access_token, user_lookup, check_token_user,
+    logger, prepare_database,
+)
+import passwords
+from passwords import hash_password_async, verify_password_async, needs_rehash
+
+def get_async_database_url(url: str):
+    """Translate a sync DATABASE_URL to its async driver equivalent.
+
+    Returns the async URL and the connect_args the driver needs. asyncpg does not
+    understand libpq's sslmode/channel_binding query parameters, so they are
+    stripped and mapped onto asyncpg's ``ssl`` argument instead.
+    """
+    connect_args = {}
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://"):], connect_args
+
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    if url.startswith("postgresql://") or url.startswith("postgresql+psycopg2://"):
+        parts = urlsplit(url)
+        query = dict(parse_qsl(parts.query))
+        sslmode = query.pop("sslmode", None)
+        query.pop("channel_binding", None)
+        if sslmode and sslmode != "disable":
+            connect_args["ssl"] = sslmode
+        url = urlunsplit(("postgresql+asyncpg",) + tuple(parts[1:3]) + (urlencode(query), parts.fragment))
+    return url, connect_args
+
+ASYNC_DATABASE_URL, _connect_args = get_async_database_url(os.getenv("ASYNC_DATABASE_URL", DATABASE_URL))
+
+# FastAPI app
+app = FastAPI(
+    title="E-commerce API (async)",
+    description="A production-ready e-commerce API deployed on Render",
+    version="1.0.0"
+)
+
+# CORS middleware
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+@app.on_event("startup")
+async def prepare_schema():
+    """Create or update the schema on the sync engine before serving (see main.prepare_database)."""
+    logger.warning("async_main is a benchmark-only subset of main.py (no Idempotency-Key, batch orders, "
+                   "search or metrics); deploy main:app or app:app")
+    await prepare_database()
+
+@app.on_event("shutdown")
+def stop_password_workers():
+    """Stop the password hashing processes with the server."""
+    passwords.shutdown()
+
+# Database setup (tables are created by main's prepare_database startup hook)
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, connect_args=_connect_args, **pool_options(ASYNC_DATABASE_URL, is_async=True)
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+
+async def get_db():
+    """Async database dependency."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: AsyncSession = Depends(get_db)):
+    """Get current authenticated user (same checks as main.get_current_user, without its cache)."""
+    payload = decode_access_token(credentials.credentials)
+    user = (await db.execute(user_lookup(payload))).scalars().first()
+    return check_token_user(user, payload)
+
+# Routes
+@app.get("/")
+async def read_root():
+    """Health check endpoint."""
+    return {
+        "message": "E-commerce API is running on Render!",
+        "status": "healthy",
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+@app.get("/health")
+async def health_check():
+    """Health check for monitoring."""
+    return {"status": "healthy", "timestamp": datetime.utcnow().isoformat()}
+
+@app.get("/stats/pool")
+async def database_pool_stats():
+    """Connection pool gauges and checkout wait/timeout counters."""
+    return pool_status(async_engine.sync_engine)
+
+@app.post("/register", response_model=UserResponse)
+async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
+    """Register a new user."""
+    # Check if user already exists
+    result = await db.execute(select(User).where(
+        (User.email == user.email) | (User.username == user.username)
+    ))
+    if result.scalars().first():
+        raise HTTPException(
+            status_code=400,
+            detail="Email or username already registered"
+        )
+
+    # Create new user
+    db_user = User(
+        email=user.email,
+        username=user.username,
+        hashed_password=await hash_password_async(user.password)
+    )
+    db.add(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+
+    logger.info(f"New user registered: {user.username}")
+    return db_user
+
+@app.post("/login", response_model=Token)
+async def login(username: str, password: str, db: AsyncSession = Depends(get_db)):
+    """Login user and return access token."""
+    user = (await db.execute(select(User).where(User.username == username))).scalars().first()
+    if not user or not await verify_password_async(password, user.hashed_password):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect username or password",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_access_token(
+        data={"sub": user.username, "uid": user.id, "act": user.is_active}, expires_delta=access_token_expires
+    )
+
+    # Upgrade legacy SHA-256 hashes (and older work factors) now that we have the password
+    if needs_rehash(user.hashed_password):
+        user.hashed_password = await hash_password_async(password)
+        await db.commit()
+        logger.info(f"Password hash upgraded: {username}")
+
+    logger.info(f"User logged in: {username}")
+    return {"access_token": access_token, "token_type": "bearer"}
+
+@app.get("/users/me", response_model=UserResponse)
+async def read_users_me(current_user: User = Depends(get_current_user)):
+    """Get current user information."""
+    return current_user
+
+@app.post("/products", response_model=ProductResponse)
+async def create_product(product: ProductCreate, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    """Create a new product."""
+    db_product = Product(**product.dict())
+    db.add(db_product)
+    await db.execute(category_stats_upsert(async_engine.dialect.name, {
+        product.category: (1, 1 if product.stock_quantity > 0 else 0)
+    }))
+    await db.commit()
+    await db.refresh(db_product)
+
+    logger.info(f"New product created: {product.name} by user {current_user.username}")
+    return db_product
+
+@app.get("/products", response_model=List[ProductResponse])
+async def read_products(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_db)):
+    """Get all products."""
+    result = await db.execute(select(Product).offset(skip).limit(limit))
+    return result.scalars().all()
+
+@app.get("/products/{product_id}", response_model=ProductResponse)
+async def read_product(product_id: int, db: AsyncSession = Depends(get_db)):
+    """Get a specific product."""
+    product = await db.get(Product, product_id)
+    if product is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return product
+
+@app.post("/orders", response_model=OrderResponse)
+async def create_order(order: OrderCreate, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    """Create a new order."""
+    # Combine repeated lines for the same product
+    quantities = {}
+    for item in order.items:
+        quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+
+    # Fetch every product in the cart with a single IN (...) query
+    result = await db.execute(select(Product).where(Product.id.in_(quantities)))
+    products = {p.id: p for p in result.scalars()}
+
+    # Validate products and calculate total
+    for product_id, quantity in quantities.items():
+        product = products.get(product_id)
+        if not product:
+            raise HTTPException(status_code=404, detail=f"Product {product_id} not found")
+        if product.stock_quantity < quantity:
+            raise HTTPException(status_code=409, detail=f"Insufficient stock for product {product.name}")
+
+    # Reserve stock for the whole cart in one conditional UPDATE (see main.reserve_stock)
+    if quantities:
+        reserved = (await db.execute(reserve_stock_statement(quantities))).all()
+        if len(reserved) != len(quantities):
+            await db.rollback()
+            raise HTTPException(status_code=409, detail="Insufficient stock for one or more products")
+
+        # Products that just sold out leave their category's in-stock count
+        upsert = sold_out_upsert(async_engine.dialect.name, reserved, quantities)
+        if upsert is not None:
+            await db.execute(upsert)
+
+    total_amount = 0
+    item_rows = []
+    for item in order.items:
+        item_total = products[item.product_id].price * item.quantity
+        total_amount += item_total
+        item_rows.append({"product_id": item.product_id, "quantity": item.quantity, "price": item_total})
+
+    # Create order
+    db_order = Order(user_id=current_user.id, total_amount=total_amount)
+    db.add(db_order)
+    await db.flush()
+
+    # Insert all order items with one multi-row INSERT ... RETURNING
+    items = []
+    if item_rows:
+        result = await db.execute(
+            insert(OrderItem.__table__).values([dict(row, order_id=db_order.id) for row in item_rows]).returning(
+                OrderItem.id, OrderItem.product_id, OrderItem.quantity, OrderItem.price
+            )
+        )
+        items = sorted((OrderItemResponse(**row._mapping) for row in result), key=lambda i: i.id)
+
+    # Build the response from in-memory state instead of refreshing after commit
+    response = OrderResponse(
+        id=db_order.id,
+        user_id=db_order.user_id,
+        total_amount=db_order.total_amount,
+        status=db_order.status,
+        created_at=db_order.created_at,
+        items=items,
+    )
+    await db.commit()
+
+    logger.info(f"New order created: {response.id} by user {current_user.username}")
+    return response
+
+@app.get("/orders", response_model=List[OrderResponse])
+async def read_user_orders(current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    """Get current user's orders, newest first."""
+    result = await db.execute(
+        select(Order).options(selectinload(Order.items)).where(Order.user_id == current_user.id)
+        .order_by(Order.created_at.desc(), Order.id.desc())
+    )
+    return result.scalars().all()
+
+@app.get("/orders/{order_id}", response_model=OrderResponse)
+async def read_order(order_id: int, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    """Get a specific order."""
+    result = await db.execute(
+        select(Order).options(selectinload(Order.items)).where(
+            Order.id == order_id,
+            Order.user_id == current_user.id
+        )
+    )
+    order = result.scalars().first()
+    if order is None:
+        raise HTTPException(status_code=404, detail="Order not found")
+    return order
+
+if __name__ == "__main__":
+    port = int(os.environ.get("PORT", 8000))
+    uvicorn.run(app, host="0.0.0.0", port=port)
@@ -0,0 +1,71 @@
+"""
+Sync vs async request path benchmark
+Starts main:app (threadpool + sync Session) and async_main:app (AsyncSession)
+against the same database and compares requests/sec under concurrent load.
+
+Usage: python benchmarks/bench_async.py [--concurrency 200] [--duration 10]
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from common import temp_database_url, run_server, seed_products
+
+NO_CACHE_ENV = {"PRODUCT_CACHE_SIZE": "0", "PRODUCT_LIST_CACHE_SIZE": "0"}
+
+async def hammer(base_url, concurrency, duration, product_count):
+    """Fire GET /products and GET /products/{id} from `concurrency` workers."""
+    completed = 0
+    errors = 0
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        async def worker(worker_id):
+            nonlocal completed, errors
+            i = worker_id
+            while time.perf_counter() < deadline:
+                i += 1
+                path = "/products?limit=20" if i % 2 else f"/products/{i % product_count + 1}"
+                try:
+                    response = await client.get(path)
+                    if response.status_code == 200:
+                        completed += 1
+                    else:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(n) for n in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return completed / elapsed, errors
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--products", type=int, default=1000)
+    args = parser.parse_args()
+
+    database_url = temp_database_url()
+    seed_products(database_url, args.products)
+
+    print(f"🚀 Benchmarking with {args.concurrency} concurrent clients for {args.duration}s")
+    results = {}
+    for label, app_path in (("sync", "main:app"), ("async", "async_main:app")):
+        # Compare the database paths, not main.py's catalog cache
+        with run_server(app_path, database_url, extra_env=NO_CACHE_ENV) as base_url:
+            # Warm up connections before measuring
+            asyncio.run(hammer(base_url, 10, 1, args.products))
+            rps, errors = asyncio.run(hammer(base_url, args.concurrency, args.duration, args.products))
+        results[label] = rps
+        print(f"  {label:>5}: {rps:8.1f} req/s ({errors} errors)")
+
+    print(f"📊 async/sync ratio: {results['async'] / results['sync']:.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Authenticated request latency benchmark
+Measures GET /users/me and GET /orders with the principal cache enabled and
+disabled, counting the statements each request sends to the database. Use
+--rtt-ms to add a simulated network round trip per statement.
+
+Usage: python benchmarks/bench_auth.py [--repeat 200] [--rtt-ms 0]
+"""
+import argparse
+import os
+import statistics
+import time
+
+from common import temp_database_url, seed_products, percentile
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--rtt-ms", type=float, default=0.0, help="simulated latency per statement")
+    args = parser.parse_args()
+
+    database_url = temp_database_url()
+    os.environ["DATABASE_URL"] = database_url
+    seed_products(database_url, 10)
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+    import main
+
+    statements = []
+
+    @event.listens_for(main.engine, "before_cursor_execute")
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+        if args.rtt_ms:
+            time.sleep(args.rtt_ms / 1000)
+
+    client = TestClient(main.app)
+    client.post("/register", json={"email": "bench@example.com", "username": "bench", "password": "benchpassword123"})
+    token = client.post("/login", params={"username": "bench", "password": "benchpassword123"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    client.post("/orders", json={"items": [{"product_id": 1, "quantity": 1}]}, headers=headers)
+    cache_size = main.principal_cache.maxsize
+
+    print(f"🔐 Authenticated request benchmark ({args.repeat} requests each, rtt={args.rtt_ms}ms)")
+    for label, maxsize in (("no cache", 0), ("cached", cache_size)):
+        main.principal_cache.maxsize = maxsize
+        main.principal_cache.clear()
+        for path in ("/users/me", "/orders"):
+            client.get(path, headers=headers).raise_for_status()  # warmup
+            latencies = []
+            round_trips = []
+            for _ in range(args.repeat):
+                statements.clear()
+                start = time.perf_counter()
+                client.get(path, headers=headers).raise_for_status()
+                latencies.append((time.perf_counter() - start) * 1000)
+                round_trips.append(len(statements))
+            print(f"  {label:>8} {path:<10}: median {statistics.median(latencies):7.2f} ms, "
+                  f"p99 {percentile(latencies, 99):7.2f} ms, {statistics.median(round_trips):.0f} statements")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+create_order round trips and latency benchmark
+Posts carts of 1, 10 and 100 lines through the in-process test client and
+counts every statement sent to the database during the request. Use --rtt-ms
+to add a simulated network round trip per statement (e.g. a remote Postgres).
+
+Usage: python benchmarks/bench_create_order.py [--repeat 20] [--rtt-ms 0]
+"""
+import argparse
+import os
+import statistics
+import time
+
+from common import temp_database_url, seed_products
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--rtt-ms", type=float, default=0.0, help="simulated latency per statement")
+    parser.add_argument("--cart-sizes", type=int, nargs="+", default=[1, 10, 100])
+    args = parser.parse_args()
+
+    database_url = temp_database_url()
+    os.environ["DATABASE_URL"] = database_url
+    seed_products(database_url, max(args.cart_sizes))
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+    import main
+
+    statements = []
+
+    @event.listens_for(main.engine, "before_cursor_execute")
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+        if args.rtt_ms:
+            time.sleep(args.rtt_ms / 1000)
+
+    client = TestClient(main.app)
+    client.post("/register", json={"email": "bench@example.com", "username": "bench", "password": "benchpassword123"})
+    token = client.post("/login", params={"username": "bench", "password": "benchpassword123"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    print(f"🛒 create_order benchmark ({args.repeat} orders per cart size, rtt={args.rtt_ms}ms)")
+    for size in args.cart_sizes:
+        cart = {"items": [{"product_id": i + 1, "quantity": 1} for i in range(size)]}
+        client.post("/orders", json=cart, headers=headers)  # warmup
+
+        latencies = []
+        round_trips = []
+        for _ in range(args.repeat):
+            statements.clear()
+            start = time.perf_counter()
+            response = client.post("/orders", json=cart, headers=headers)
+            latencies.append((time.perf_counter() - start) * 1000)
+            round_trips.append(len(statements))
+            response.raise_for_status()
+
+        print(f"  {size:>4} lines: {statistics.median(round_trips):>4.0f} round trips, "
+              f"median {statistics.median(latencies):7.2f} ms, max {max(latencies):7.2f} ms")
+
+if __name__ == "__main__":
+    main()
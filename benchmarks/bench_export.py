@@ -0,0 +1,82 @@
+"""
+Streaming export memory/throughput benchmark
+Seeds a large product table (and orders for one user), starts main:app and
+streams GET /export/products and GET /export/orders in NDJSON and CSV,
+reporting rows/sec, MB/sec and the server's resident memory before and after.
+Peak memory should not grow with the table size.
+
+Usage: python benchmarks/bench_export.py [--products 2000000] [--orders 200000]
+"""
+import argparse
+import random
+import time
+from datetime import datetime
+
+import requests
+
+from common import temp_database_url, run_server, create_user_and_login, seed_products, memory_mb, SERVER_PIDS
+
+def seed_orders(database_url, count, product_count, username="benchuser"):
+    """Bulk insert `count` orders with 1-3 items each for an existing user."""
+    from sqlalchemy import create_engine, insert, select
+    from main import User, Order, OrderItem
+
+    rng = random.Random(7)
+    engine = create_engine(database_url)
+    with engine.begin() as conn:
+        user_id = conn.execute(select(User.id).where(User.username == username)).scalar_one()
+        next_order_id = 1
+        for offset in range(0, count, 10_000):
+            orders = []
+            items = []
+            for order_id in range(next_order_id, next_order_id + min(10_000, count - offset)):
+                orders.append({"id": order_id, "user_id": user_id, "total_amount": 0.0,
+                               "status": "pending", "created_at": datetime.utcnow()})
+                for _ in range(rng.randint(1, 3)):
+                    items.append({"order_id": order_id, "product_id": rng.randint(1, product_count),
+                                  "quantity": 1, "price": 9.99})
+            conn.execute(insert(Order), orders)
+            conn.execute(insert(OrderItem), items)
+            next_order_id += len(orders)
+    engine.dispose()
+
+def stream(base_url, path, params, headers=None):
+    """Download a streamed export; return (lines, bytes, seconds)."""
+    lines = 0
+    size = 0
+    start = time.perf_counter()
+    with requests.get(f"{base_url}{path}", params=params, headers=headers, stream=True) as response:
+        response.raise_for_status()
+        for chunk in response.iter_content(chunk_size=1 << 16):
+            size += len(chunk)
+            lines += chunk.count(b"\n")
+    return lines, size, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=2_000_000)
+    parser.add_argument("--orders", type=int, default=200_000)
+    args = parser.parse_args()
+
+    database_url = temp_database_url()
+    print(f"📦 Seeding {args.products:,} products...")
+    seed_products(database_url, args.products)
+
+    with run_server("main:app", database_url) as base_url:
+        pid = SERVER_PIDS[base_url]
+        headers = create_user_and_login(base_url)
+        print(f"📦 Seeding {args.orders:,} orders...")
+        seed_orders(database_url, args.orders, args.products)
+
+        rss, _ = memory_mb(pid)
+        print(f"📤 Streaming exports (server RSS at start: {rss:.0f} MB)")
+        for path, auth in (("/export/products", None), ("/export/orders", headers)):
+            for fmt in ("ndjson", "csv"):
+                lines, size, seconds = stream(base_url, path, {"format": fmt}, auth)
+                rss, peak = memory_mb(pid)
+                print(f"  {path} {fmt:>6}: {lines:>10,} lines, {size / 1e6:8.1f} MB in {seconds:6.1f}s "
+                      f"({lines / seconds:>9,.0f} lines/s, {size / 1e6 / seconds:5.1f} MB/s), "
+                      f"server RSS {rss:.0f} MB, peak {peak:.0f} MB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Catalog latency during a login storm
+Starts main:app, measures GET /products latency on its own, then again while
+many clients log in concurrently. Runs once with the scrypt KDF in the
+passwords worker pool and once with PASSWORD_HASH_WORKERS=0 (KDF in the
+request threadpool) for comparison.
+
+Usage: python benchmarks/bench_login_storm.py [--logins 32] [--duration 5]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from common import temp_database_url, run_server, seed_products, percentile
+
+PASSWORD = "stormpassword123"
+
+async def probe(client, duration):
+    """Sequential GET /products latencies in ms for `duration` seconds."""
+    samples = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = await client.get("/products?limit=20")
+        response.raise_for_status()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+async def storm(base_url, users, concurrency, duration):
+    """Probe /products while `concurrency` clients log in back to back."""
+    limits = httpx.Limits(max_connections=concurrency + 1)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        baseline = await probe(client, duration)
+        logins = 0
+        stop = asyncio.Event()
+
+        async def login_loop(worker_id):
+            nonlocal logins
+            i = worker_id
+            while not stop.is_set():
+                username = users[i % len(users)]
+                response = await client.post("/login", params={"username": username, "password": PASSWORD})
+                response.raise_for_status()
+                logins += 1
+                i += concurrency
+
+        workers = [asyncio.create_task(login_loop(n)) for n in range(concurrency)]
+        await asyncio.sleep(0.5)  # let the storm build up
+        start = time.perf_counter()
+        during = await probe(client, duration)
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await asyncio.gather(*workers)
+    return baseline, during, logins / (elapsed + 0.5)
+
+def summarize(samples):
+    return f"p50 {statistics.median(samples):7.2f} ms, p99 {percentile(samples, 99):7.2f} ms"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=32, help="concurrent login clients")
+    parser.add_argument("--users", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=5)
+    args = parser.parse_args()
+
+    database_url = temp_database_url()
+    seed_products(database_url, 100)
+    users = [f"storm{i}" for i in range(args.users)]
+
+    print(f"🔑 GET /products latency with {args.logins} concurrent logins")
+    for label, extra_env in (("worker pool", {}), ("threadpool", {"PASSWORD_HASH_WORKERS": "0"})):
+        with run_server("main:app", database_url, extra_env=extra_env) as base_url:
+            with httpx.Client(base_url=base_url) as client:
+                for username in users:
+                    client.post("/register", json={"email": f"{username}@example.com",
+                                                   "username": username, "password": PASSWORD})
+            baseline, during, login_rate = asyncio.run(storm(base_url, users, args.logins, args.duration))
+        print(f"  {label:>11}: idle   {summarize(baseline)}")
+        print(f"  {'':>11}  storm  {summarize(during)}  ({login_rate:.1f} logins/s)")
+
+if __name__ == "__main__":
+    main()
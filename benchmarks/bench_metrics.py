@@ -0,0 +1,76 @@
+"""
+Metrics middleware overhead benchmark
+Calls ASGI apps directly (no network, no HTTP parsing) so the per-request cost
+of MetricsMiddleware is not lost in noise: first around a bare endpoint, then
+on main.app's GET /health with the middleware active and bypassed.
+
+Usage: python benchmarks/bench_metrics.py [--requests 20000] [--rounds 5]
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from common import temp_database_url
+
+def make_scope(path):
+    return {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+            "query_string": b"", "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 1),
+            "server": ("bench", 80)}
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+async def send(message):
+    pass
+
+async def bare_endpoint(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+async def time_requests(app, path, count, bypass=False):
+    """Best-of-batch microseconds per request."""
+    from metrics import SCOPE_KEY
+    best = float("inf")
+    batch = 1000
+    for _ in range(count // batch):
+        start = time.perf_counter()
+        for _ in range(batch):
+            scope = make_scope(path)
+            if bypass:
+                scope[SCOPE_KEY] = True  # the middleware steps aside, as it does for mounted apps
+            await app(scope, receive, send)
+        best = min(best, (time.perf_counter() - start) / batch * 1e6)
+    return best
+
+async def run(args):
+    import main
+    from metrics import MetricsMiddleware, MetricsRegistry
+
+    wrapped = MetricsMiddleware(bare_endpoint, registry=MetricsRegistry())
+    await time_requests(main.app, "/health", 1000)  # build the middleware stack and warm up
+
+    print(f"📈 Metrics middleware overhead ({args.requests:,} requests x {args.rounds} rounds, best batch)")
+    cases = (
+        ("bare ASGI endpoint", lambda bypass: time_requests(bare_endpoint if bypass else wrapped, "/", args.requests)),
+        ("main.app GET /health", lambda bypass: time_requests(main.app, "/health", args.requests, bypass)),
+    )
+    for label, measure in cases:
+        without = with_metrics = float("inf")
+        for _ in range(args.rounds):  # interleaved so drift affects both sides alike
+            without = min(without, await measure(True))
+            with_metrics = min(with_metrics, await measure(False))
+        print(f"  {label:<22}: {without:8.2f} µs without, {with_metrics:8.2f} µs with, "
+              f"overhead {with_metrics - without:6.2f} µs/request")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    os.environ["DATABASE_URL"] = temp_database_url()
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Batch vs single order ingestion throughput
+Starts main:app and creates the same orders twice: one POST /orders per
+order, then POST /orders/batch in chunks of --batch-size. Reports orders/sec
+for both, and the SQL statements each batch request ran (from its
+Server-Timing header), which should stay constant as batches grow.
+
+Usage: python benchmarks/bench_order_batch.py [--orders 2000] [--batch-size 500]
+"""
+import argparse
+import random
+import re
+import time
+
+import requests
+
+from common import temp_database_url, run_server, create_user_and_login, seed_products
+
+def statement_count(response):
+    """Queries reported in the Server-Timing header added by sql_trace."""
+    match = re.search(r'desc="(\d+) queries"', response.headers.get("Server-Timing", ""))
+    return int(match.group(1)) if match else None
+
+def make_orders(count, product_count, max_lines, rng):
+    return [
+        {"items": [{"product_id": rng.randint(1, product_count), "quantity": rng.randint(1, 3)}
+                   for _ in range(rng.randint(1, max_lines))]}
+        for _ in range(count)
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--max-lines", type=int, default=5, help="max line items per order")
+    args = parser.parse_args()
+
+    database_url = temp_database_url()
+    seed_products(database_url, args.products)
+    orders = make_orders(args.orders, args.products, args.max_lines, random.Random(42))
+
+    print(f"📦 Ingesting {args.orders} orders (up to {args.max_lines} lines each)")
+    with run_server("main:app", database_url) as base_url:
+        session = requests.Session()
+        session.headers.update(create_user_and_login(base_url))
+
+        start = time.perf_counter()
+        for order in orders:
+            session.post(f"{base_url}/orders", json=order).raise_for_status()
+        single_rate = len(orders) / (time.perf_counter() - start)
+        print(f"  POST /orders:       {single_rate:8.1f} orders/s")
+
+        created = 0
+        statements = []
+        start = time.perf_counter()
+        for offset in range(0, len(orders), args.batch_size):
+            response = session.post(f"{base_url}/orders/batch", json={"orders": orders[offset:offset + args.batch_size]})
+            response.raise_for_status()
+            created += response.json()["created"]
+            statements.append(statement_count(response))
+        batch_rate = len(orders) / (time.perf_counter() - start)
+        print(f"  POST /orders/batch: {batch_rate:8.1f} orders/s (batches of {args.batch_size}, {created} created)")
+        if None not in statements:
+            print(f"  SQL statements per batch: {min(statements)}-{max(statements)}")
+
+    print(f"📊 speedup: {batch_rate / single_rate:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Oversell concurrency check for POST /orders
+Fires hundreds of parallel single-unit orders at one product with limited stock
+against a running server, then verifies that stock never went negative and that
+exactly as many units were sold as orders succeeded. Exits non-zero on oversell.
+
+Usage: python benchmarks/bench_oversell.py [--orders 500] [--stock 100] [--concurrency 100]
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+import httpx
+from sqlalchemy import create_engine, func, select
+
+from common import temp_database_url, run_server, seed_products, create_user_and_login
+
+async def place_orders(base_url, headers, orders, concurrency):
+    """POST `orders` single-unit orders for product 1; return status code counts."""
+    counts = {}
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=60) as client:
+        async def order_one():
+            async with semaphore:
+                try:
+                    response = await client.post("/orders", json={"items": [{"product_id": 1, "quantity": 1}]})
+                    code = response.status_code
+                except httpx.HTTPError:
+                    code = "error"
+                counts[code] = counts.get(code, 0) + 1
+
+        await asyncio.gather(*(order_one() for _ in range(orders)))
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=500)
+    parser.add_argument("--stock", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--app", default="main:app", help="app to test, e.g. async_main:app")
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    database_url = temp_database_url()
+    seed_products(database_url, 1, stock=args.stock)
+
+    with run_server(args.app, database_url, workers=args.workers) as base_url:
+        headers = create_user_and_login(base_url)
+        start = time.perf_counter()
+        counts = asyncio.run(place_orders(base_url, headers, args.orders, args.concurrency))
+        elapsed = time.perf_counter() - start
+
+    from main import Product, OrderItem
+    engine = create_engine(database_url)
+    with engine.connect() as conn:
+        remaining = conn.execute(select(Product.stock_quantity).where(Product.id == 1)).scalar_one()
+        sold = conn.execute(select(func.coalesce(func.sum(OrderItem.quantity), 0))).scalar_one()
+    engine.dispose()
+
+    succeeded = counts.get(200, 0)
+    print(f"🛒 {args.orders} orders against stock {args.stock} ({args.concurrency} concurrent, {args.app})")
+    print(f"  responses: {counts}")
+    print(f"  throughput: {args.orders / elapsed:.1f} orders/s")
+    print(f"  sold {sold}, remaining stock {remaining}")
+
+    # Every acknowledged order must be persisted, and stock must balance exactly
+    ok = remaining >= 0 and sold >= succeeded and sold + remaining == args.stock
+    print("✅ No oversell" if ok else "❌ Oversell or lost update detected")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Offset vs keyset pagination benchmark for the product catalog
+Seeds a large product table, then measures the latency of fetching a deep page
+with GET /products?skip=&limit= and with GET /products/page?cursor=.
+
+Usage: python benchmarks/bench_pagination.py [--products 1000000] [--page 1000]
+"""
+import argparse
+import os
+import statistics
+import time
+
+from common import temp_database_url, seed_products
+
+def measure(client, path, params, repeat):
+    """Median and best latency in ms for `repeat` GETs of one page."""
+    client.get(path, params=params).raise_for_status()  # warmup
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        client.get(path, params=params).raise_for_status()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), min(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=1_000_000)
+    parser.add_argument("--page", type=int, default=1000, help="1-based page number to fetch")
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    database_url = temp_database_url()
+    os.environ["DATABASE_URL"] = database_url
+    # Measure the database path, not the catalog cache
+    os.environ["PRODUCT_LIST_CACHE_SIZE"] = "0"
+    print(f"📦 Seeding {args.products:,} products...")
+    start = time.perf_counter()
+    seed_products(database_url, args.products)
+    print(f"  done in {time.perf_counter() - start:.1f}s")
+
+    from fastapi.testclient import TestClient
+    import main
+
+    client = TestClient(main.app)
+    skip = (args.page - 1) * args.limit
+    # The cursor a client holds after reading page - 1 (ids are dense in a fresh table)
+    cursor = main.encode_cursor({"category": None, "id": skip})
+
+    offset_ms = measure(client, "/products", {"skip": skip, "limit": args.limit}, args.repeat)
+    keyset_ms = measure(client, "/products/page", {"cursor": cursor, "limit": args.limit}, args.repeat)
+
+    print(f"📊 Page {args.page} ({args.limit} rows/page, skip={skip:,})")
+    print(f"  offset: median {offset_ms[0]:8.2f} ms, best {offset_ms[1]:8.2f} ms")
+    print(f"  keyset: median {keyset_ms[0]:8.2f} ms, best {keyset_ms[1]:8.2f} ms")
+
+if __name__ == "__main__":
+    main()
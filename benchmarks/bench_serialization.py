@@ -0,0 +1,57 @@
+"""
+List serialization microbenchmark
+Compares the pydantic response_model path (ORM rows validated one at a time
+with from_attributes, then encoded with the stdlib json module) against the
+orjson fast path main.py uses for /products and /orders.
+
+Usage: python benchmarks/bench_serialization.py [--rows 100] [--repeat 2000]
+"""
+import argparse
+import json
+import os
+import timeit
+from typing import List
+
+from common import temp_database_url, seed_products
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    database_url = temp_database_url()
+    os.environ["DATABASE_URL"] = database_url
+    seed_products(database_url, args.rows)
+
+    import orjson
+    from fastapi.encoders import jsonable_encoder
+    from pydantic import TypeAdapter
+    import main
+
+    db = main.SessionLocal()
+    orm_rows = db.query(main.Product).order_by(main.Product.id).all()
+    column_rows = db.query(*main.PRODUCT_COLUMNS).order_by(main.Product.id).all()
+    adapter = TypeAdapter(List[main.ProductResponse])
+
+    def pydantic_path():
+        # What FastAPI does for response_model=List[ProductResponse]
+        products = adapter.validate_python(orm_rows, from_attributes=True)
+        return json.dumps(jsonable_encoder(products)).encode()
+
+    def fast_path():
+        return orjson.dumps(main.product_rows(column_rows))
+
+    assert json.loads(pydantic_path()) == json.loads(fast_path())
+
+    print(f"⚡ Serializing {args.rows} products, {args.repeat} iterations")
+    results = {}
+    for label, func in (("pydantic+json", pydantic_path), ("orjson fast path", fast_path)):
+        seconds = min(timeit.repeat(func, number=args.repeat, repeat=3)) / args.repeat
+        results[label] = seconds
+        print(f"  {label:>16}: {seconds * 1e6:9.1f} µs/page")
+    print(f"📊 speedup: {results['pydantic+json'] / results['orjson fast path']:.1f}x")
+    db.close()
+
+if __name__ == "__main__":
+    main()
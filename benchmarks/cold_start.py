@@ -0,0 +1,131 @@
+"""
+Cold start budget check and startup profiler
+Starts each app entry point under uvicorn several times against an
+already-migrated SQLite database and measures the time from process launch to
+the first successful GET /health. Exits with status 1 when the median for any
+entry point exceeds --budget-ms, so it can gate deploys. The first boot on an
+empty database (which runs the schema migration) is reported for reference.
+
+--profile instead shows where a cold start goes: the slowest imports from
+`python -X importtime` and a cProfile of importing the app and running its
+startup hooks, each in a fresh interpreter.
+
+Usage: python benchmarks/cold_start.py [--budget-ms 2500] [--runs 5]
+       python benchmarks/cold_start.py --profile --apps app:app
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import requests
+
+from common import REPO_ROOT, temp_database_url, free_port
+
+DEFAULT_APPS = "main:app,app:app,unified_app:app"
+HEALTH_PATHS = {"unified_app:app": "/api/health"}
+
+# Imports the app and runs its startup hooks under cProfile in a fresh interpreter
+PROFILE_SCRIPT = """
+import cProfile, importlib, pstats, sys
+module_name, attribute = sys.argv[1].split(":")
+profiler = cProfile.Profile()
+profiler.enable()
+app = getattr(importlib.import_module(module_name), attribute)
+from fastapi.testclient import TestClient
+with TestClient(app):
+    pass
+profiler.disable()
+# Skip the import machinery frames that would otherwise fill the top of the list
+pstats.Stats(profiler).sort_stats("cumulative").print_stats(r"^(?!<frozen|\{)", int(sys.argv[2]))
+"""
+
+def time_to_ready(app_path, database_url, timeout=60):
+    """Milliseconds from launching uvicorn until its health check answers 200."""
+    port = free_port()
+    env = dict(os.environ, DATABASE_URL=database_url)
+    url = f"http://127.0.0.1:{port}{HEALTH_PATHS.get(app_path, '/health')}"
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app_path, "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=REPO_ROOT, env=env,
+    )
+    try:
+        while True:
+            try:
+                if requests.get(url, timeout=1).status_code == 200:
+                    return (time.perf_counter() - start) * 1000
+            except requests.RequestException:
+                pass
+            if process.poll() is not None or time.perf_counter() - start > timeout:
+                raise RuntimeError(f"{app_path} failed to start")
+            time.sleep(0.005)
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+def migrated_database():
+    database_url = temp_database_url()
+    subprocess.run([sys.executable, "init_database.py", "--schema-only", "--database-url", database_url],
+                   cwd=REPO_ROOT, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return database_url
+
+def import_times(module, top):
+    """Slowest imports by cumulative time, from python -X importtime."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=REPO_ROOT, capture_output=True, text=True,
+                            env=dict(os.environ, DATABASE_URL=migrated_database()))
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), int(self_us), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+def profile(apps, top):
+    for app_path in apps:
+        module = app_path.split(":")[0]
+        print(f"\n🔬 {app_path}: slowest imports (cumulative ms, self ms)")
+        for cumulative_us, self_us, name in import_times(module, top):
+            print(f"  {cumulative_us / 1000:8.1f} {self_us / 1000:8.1f}  {name}")
+        print(f"\n🔬 {app_path}: import + startup hooks under cProfile")
+        subprocess.run([sys.executable, "-c", PROFILE_SCRIPT, app_path, str(top)], cwd=REPO_ROOT,
+                       env=dict(os.environ, DATABASE_URL=migrated_database()), check=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--apps", default=DEFAULT_APPS, help=f"comma-separated uvicorn app paths (default {DEFAULT_APPS})")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=2500, help="allowed median time to first healthy response")
+    parser.add_argument("--profile", action="store_true", help="show import and startup profiles instead")
+    parser.add_argument("--top", type=int, default=20, help="rows to show with --profile")
+    args = parser.parse_args()
+    apps = args.apps.split(",")
+
+    if args.profile:
+        profile(apps, args.top)
+        return
+
+    print(f"🥶 Cold start: launch to first healthy response ({args.runs} runs, budget {args.budget_ms:.0f} ms)")
+    over_budget = []
+    for app_path in apps:
+        first_boot = time_to_ready(app_path, temp_database_url())
+        database_url = migrated_database()
+        samples = [time_to_ready(app_path, database_url) for _ in range(args.runs)]
+        median = statistics.median(samples)
+        verdict = "✅" if median <= args.budget_ms else "❌"
+        print(f"  {verdict} {app_path:<18} median {median:7.0f} ms, max {max(samples):7.0f} ms "
+              f"(first boot with migration {first_boot:7.0f} ms)")
+        if median > args.budget_ms:
+            over_budget.append(app_path)
+
+    if over_budget:
+        print(f"❌ Over the {args.budget_ms:.0f} ms budget: {', '.join(over_budget)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Shared helpers for the benchmark scripts
+Each benchmark runs against a throwaway SQLite database unless DATABASE_URL is set.
+"""
+import logging
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+import requests
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+# Keep per-request client logging out of benchmark output
+logging.getLogger("httpx").setLevel(logging.WARNING)
+logging.getLogger("main").setLevel(logging.WARNING)
+
+# base URL -> pid of each server started by run_server, for reading its memory use
+SERVER_PIDS = {}
+
+def temp_database_url():
+    """Return DATABASE_URL from the environment or a fresh SQLite file URL."""
+    if os.environ.get("DATABASE_URL"):
+        return os.environ["DATABASE_URL"]
+    fd, path = tempfile.mkstemp(prefix="bench_", suffix=".db")
+    os.close(fd)
+    os.remove(path)
+    return f"sqlite:///{path}"
+
+def free_port():
+    """Pick an unused local TCP port."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+@contextmanager
+def run_server(app_path, database_url, port=None, extra_env=None, workers=1):
+    """Start `uvicorn <app_path>` in a subprocess and yield its base URL."""
+    port = port or free_port()
+    env = dict(os.environ, DATABASE_URL=database_url, **(extra_env or {}))
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app_path,
+         "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=REPO_ROOT, env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    SERVER_PIDS[base_url] = process.pid
+    try:
+        deadline = time.time() + 30
+        while True:
+            try:
+                if requests.get(f"{base_url}/health", timeout=1).status_code == 200:
+                    break
+            except requests.RequestException:
+                pass
+            if process.poll() is not None or time.time() > deadline:
+                raise RuntimeError(f"Server {app_path} failed to start")
+            time.sleep(0.2)
+        yield base_url
+    finally:
+        SERVER_PIDS.pop(base_url, None)
+        process.terminate()
+        process.wait(timeout=10)
+
+def memory_mb(pid):
+    """Current and peak resident memory of a process in MB (Linux /proc)."""
+    values = {}
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            key, _, value = line.partition(":")
+            if key in ("VmRSS", "VmHWM"):
+                values[key] = int(value.split()[0]) / 1024
+    return values.get("VmRSS", 0.0), values.get("VmHWM", 0.0)
+
+def create_user_and_login(base_url, username="benchuser", password="benchpassword123"):
+    """Register a user (ignoring duplicates) and return auth headers."""
+    requests.post(f"{base_url}/register", json={
+        "email": f"{username}@example.com",
+        "username": username,
+        "password": password,
+    })
+    response = requests.post(f"{base_url}/login", params={"username": username, "password": password})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+def seed_products(database_url, count, categories=10, stock=1_000_000):
+    """Bulk insert `count` products straight through the ORM tables."""
+    from sqlalchemy import create_engine, insert
+    from sqlalchemy.orm import Session
+    from main import Product, ensure_database, refresh_category_stats
+    from search import deferred_search_index
+
+    engine = create_engine(database_url)
+    ensure_database(engine)
+    batch = []
+    with deferred_search_index(engine), engine.begin() as conn:
+        for i in range(count):
+            batch.append({
+                "name": f"Product {i}",
+                "description": f"Benchmark product number {i}",
+                "price": round(1 + (i % 500) * 0.37, 2),
+                "stock_quantity": stock,
+                "category": f"Category {i % categories}",
+            })
+            if len(batch) == 10_000:
+                conn.execute(insert(Product), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(Product), batch)
+    with Session(engine) as db:
+        refresh_category_stats(db)
+        db.commit()
+    engine.dispose()
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
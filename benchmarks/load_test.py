@@ -0,0 +1,242 @@
+"""
+Concurrent load test
+Starts the app under uvicorn (or targets --base-url), seeds products and user
+accounts, then runs virtual users that each loop through weighted scenarios:
+
+  browse   GET /categories, GET /products, GET /products/{id}
+  search   GET /products/search
+  checkout POST /orders (with an Idempotency-Key)
+  history  GET /orders/page, GET /orders/{id}
+
+Reports throughput, error rate and p50/p95/p99 latency per endpoint as JSON, so
+runs can be saved and compared (--output, --compare). test_api.py remains the
+sequential smoke test for a deployed instance.
+
+Usage: python benchmarks/load_test.py [--concurrency 50] [--duration 30]
+           [--mix browse=50,search=20,checkout=15,history=15] [--output run.json]
+       DATABASE_URL=postgresql://localhost/bench python benchmarks/load_test.py --workers 4
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import sys
+import time
+import uuid
+from contextlib import nullcontext
+
+import httpx
+
+from common import temp_database_url, run_server, seed_products, percentile
+
+DEFAULT_MIX = "browse=50,search=20,checkout=15,history=15"
+SEARCH_TERMS = ("product", "benchmark", "number", "Product 1", "Product 42", "Category 3")
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"unknown scenario {name!r}, expected one of {', '.join(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError("the mix needs at least one positive weight")
+    return mix
+
+class Recorder:
+    """Latencies (ms) and failures per endpoint label."""
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self.statuses = {}
+
+    async def request(self, client, label, method, url, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            status = response.status_code
+        except httpx.HTTPError as e:
+            response, status = None, type(e).__name__
+        self.latencies.setdefault(label, []).append((time.perf_counter() - start) * 1000)
+        counts = self.statuses.setdefault(label, {})
+        counts[str(status)] = counts.get(str(status), 0) + 1
+        if response is None or status >= 400:
+            self.errors[label] = self.errors.get(label, 0) + 1
+            return None
+        return response
+
+    def report(self, seconds):
+        endpoints = {}
+        for label in sorted(self.latencies):
+            samples = self.latencies[label]
+            errors = self.errors.get(label, 0)
+            endpoints[label] = {
+                "requests": len(samples),
+                "errors": errors,
+                "error_rate": round(errors / len(samples), 4),
+                "throughput_rps": round(len(samples) / seconds, 2),
+                "p50_ms": round(percentile(samples, 50), 2),
+                "p95_ms": round(percentile(samples, 95), 2),
+                "p99_ms": round(percentile(samples, 99), 2),
+                "max_ms": round(max(samples), 2),
+                "statuses": self.statuses[label],
+            }
+        everything = [value for samples in self.latencies.values() for value in samples]
+        errors = sum(self.errors.values())
+        total = {
+            "requests": len(everything),
+            "errors": errors,
+            "error_rate": round(errors / len(everything), 4) if everything else 0.0,
+            "throughput_rps": round(len(everything) / seconds, 2),
+            "p50_ms": round(percentile(everything, 50), 2),
+            "p95_ms": round(percentile(everything, 95), 2),
+            "p99_ms": round(percentile(everything, 99), 2),
+        }
+        return total, endpoints
+
+async def browse(client, recorder, user):
+    await recorder.request(client, "GET /categories", "GET", "/categories")
+    skip = user.rng.randrange(0, max(1, user.products - 20))
+    await recorder.request(client, "GET /products", "GET", "/products", params={"skip": skip, "limit": 20})
+    for _ in range(3):
+        product_id = user.rng.randint(1, user.products)
+        await recorder.request(client, "GET /products/{product_id}", "GET", f"/products/{product_id}")
+
+async def search(client, recorder, user):
+    term = user.rng.choice(SEARCH_TERMS)
+    await recorder.request(client, "GET /products/search", "GET", "/products/search", params={"q": term, "limit": 20})
+
+async def checkout(client, recorder, user):
+    items = [{"product_id": user.rng.randint(1, user.products), "quantity": user.rng.randint(1, 3)}
+             for _ in range(user.rng.randint(1, 4))]
+    headers = dict(user.headers, **{"Idempotency-Key": str(uuid.uuid4())})
+    response = await recorder.request(client, "POST /orders", "POST", "/orders", json={"items": items}, headers=headers)
+    if response is not None:
+        user.order_ids.append(response.json()["id"])
+
+async def history(client, recorder, user):
+    await recorder.request(client, "GET /orders/page", "GET", "/orders/page", params={"limit": 20}, headers=user.headers)
+    if user.order_ids:
+        order_id = user.rng.choice(user.order_ids)
+        await recorder.request(client, "GET /orders/{order_id}", "GET", f"/orders/{order_id}", headers=user.headers)
+
+SCENARIOS = {"browse": browse, "search": search, "checkout": checkout, "history": history}
+
+class VirtualUser:
+    def __init__(self, headers, products, seed):
+        self.headers = headers
+        self.products = products
+        self.rng = random.Random(seed)
+        self.order_ids = []
+
+async def create_accounts(client, count):
+    """Register and log in `count` accounts; returns their auth headers."""
+    semaphore = asyncio.Semaphore(8)
+
+    async def account(i):
+        username = f"loaduser{i}"
+        password = "loadtestpassword123"
+        async with semaphore:
+            await client.post("/register", json={"email": f"{username}@example.com", "username": username, "password": password})
+            response = await client.post("/login", params={"username": username, "password": password})
+            response.raise_for_status()
+            return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    return await asyncio.gather(*(account(i) for i in range(count)))
+
+async def run_load(base_url, args):
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        accounts = await create_accounts(client, args.users)
+        names = list(args.mix)
+        weights = [args.mix[name] for name in names]
+        recorder = Recorder()
+        warmup_end = time.perf_counter() + args.warmup
+        deadline = warmup_end + args.duration
+
+        async def virtual_user(i):
+            user = VirtualUser(accounts[i % len(accounts)], args.products, args.seed + i)
+            while time.perf_counter() < warmup_end:
+                await SCENARIOS[user.rng.choices(names, weights)[0]](client, Recorder(), user)
+            while time.perf_counter() < deadline:
+                await SCENARIOS[user.rng.choices(names, weights)[0]](client, recorder, user)
+
+        await asyncio.gather(*(virtual_user(i) for i in range(args.concurrency)))
+        return recorder.report(time.perf_counter() - warmup_end)
+
+def compare(current, baseline):
+    """Print throughput and p95 changes against a previous run's JSON."""
+    print(f"📊 Compared with {baseline['config'].get('label') or 'baseline'}:", file=sys.stderr)
+    for label, stats in [("TOTAL", current["total"])] + list(current["endpoints"].items()):
+        before = baseline["total"] if label == "TOTAL" else baseline["endpoints"].get(label)
+        if not before:
+            continue
+        rps = (stats["throughput_rps"] / before["throughput_rps"] - 1) * 100 if before["throughput_rps"] else 0.0
+        p95 = (stats["p95_ms"] / before["p95_ms"] - 1) * 100 if before["p95_ms"] else 0.0
+        print(f"  {label:<28} throughput {rps:+7.1f}%  p95 {p95:+7.1f}%  "
+              f"errors {before['error_rate']:.2%} -> {stats['error_rate']:.2%}", file=sys.stderr)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app", default="main:app", help="uvicorn app path to start")
+    parser.add_argument("--base-url", help="target an already running server instead of starting one")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--concurrency", type=int, default=50, help="virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="unmeasured seconds before the run")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"scenario weights (default {DEFAULT_MIX})")
+    parser.add_argument("--users", type=int, default=20, help="accounts shared by the virtual users")
+    parser.add_argument("--products", type=int, default=1000, help="products to seed (with --base-url: how many exist)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--label", help="name stored with the results")
+    parser.add_argument("--output", help="write the JSON report here as well as stdout")
+    parser.add_argument("--compare", help="JSON report of an earlier run to compare against")
+    args = parser.parse_args()
+
+    database_url = None
+    if args.base_url:
+        server = nullcontext(args.base_url)
+    else:
+        database_url = temp_database_url()
+        seed_products(database_url, args.products)
+        server = run_server(args.app, database_url, workers=args.workers)
+
+    print(f"🚦 Load test: {args.concurrency} virtual users for {args.duration:g}s "
+          f"(+{args.warmup:g}s warmup), mix {args.mix}", file=sys.stderr)
+    with server as base_url:
+        total, endpoints = asyncio.run(run_load(base_url, args))
+
+    report = {
+        "config": {
+            "label": args.label,
+            "app": None if args.base_url else args.app,
+            "base_url": args.base_url,
+            "database": database_url.split(":", 1)[0] if database_url else None,
+            "workers": args.workers,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "mix": args.mix,
+            "users": args.users,
+            "products": args.products,
+            "seed": args.seed,
+            "python": platform.python_version(),
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "total": total,
+        "endpoints": endpoints,
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+if __name__ == "__main__":
+    main()
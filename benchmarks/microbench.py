@@ -0,0 +1,175 @@
+"""
+In-process microbenchmarks for the API hot paths
+Runs the CPU-heavy paths through FastAPI's TestClient (no network, no server
+process) against a seeded SQLite database:
+
+  create_order             POST /orders with a 3-line cart
+  read_products            GET /products?limit=100 with the list cache cleared each call
+  read_product             GET /products/{id} with the product cache cleared each call
+  get_current_user         GET /users/me with the principal cache cleared each call (JWT decode + lookup)
+  get_current_user_cached  GET /users/me served from the principal cache
+  create_access_token      main.create_access_token
+  hash_password            passwords.hash_password (scrypt, inline)
+
+Each case gets warmup calls, then --rounds rounds of --repeat calls; the score is
+the lowest round median in microseconds, which is stable across runs on one
+machine. Results are compared against a stored baseline (keyed by case and
+database size) and the script exits with status 1 when any case is slower than
+the baseline by more than --threshold. Baselines are machine specific: save one
+on the machine that will run the comparison.
+
+Usage: python benchmarks/microbench.py [--products 10000] [--save-baseline]
+       python benchmarks/microbench.py --threshold 0.15 --only create_order,read_products
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+from common import REPO_ROOT, temp_database_url, seed_products
+
+DEFAULT_BASELINE = os.path.join(REPO_ROOT, "benchmarks", "microbench_baseline.json")
+# The KDF is slow by design; fewer calls keep the run short without hurting stability
+SLOW_CASES = {"hash_password": 10}
+
+def build_cases(client, main, passwords, headers, products):
+    def create_order():
+        items = [{"product_id": (create_order.calls * 3 + i) % products + 1, "quantity": 1} for i in range(3)]
+        create_order.calls += 1
+        client.post("/orders", json={"items": items}, headers=headers).raise_for_status()
+    create_order.calls = 0
+
+    def read_products():
+        main.product_list_cache.clear()
+        client.get("/products", params={"skip": products // 2, "limit": 100}).raise_for_status()
+
+    def read_product():
+        main.product_cache.clear()
+        client.get(f"/products/{products // 2 + 1}").raise_for_status()
+
+    def get_current_user():
+        main.principal_cache.clear()
+        client.get("/users/me", headers=headers).raise_for_status()
+
+    def get_current_user_cached():
+        client.get("/users/me", headers=headers).raise_for_status()
+
+    def create_access_token():
+        main.create_access_token({"sub": "bench", "uid": 1, "act": True})
+
+    def hash_password():
+        passwords.hash_password("benchpassword123")
+
+    return {case.__name__: case for case in (
+        create_order, read_products, read_product, get_current_user,
+        get_current_user_cached, create_access_token, hash_password,
+    )}
+
+def measure(case, warmup, rounds, repeat):
+    """Lowest per-round median of `repeat` timed calls, in microseconds."""
+    for _ in range(warmup):
+        case()
+    medians = []
+    for _ in range(rounds):
+        samples = []
+        gc.collect()
+        gc.disable()  # keep collector pauses out of individual samples
+        try:
+            for _ in range(repeat):
+                start = time.perf_counter_ns()
+                case()
+                samples.append((time.perf_counter_ns() - start) / 1000)
+        finally:
+            gc.enable()
+        medians.append(statistics.median(samples))
+    return {"us": round(min(medians), 2), "spread": round((max(medians) - min(medians)) / min(medians), 4)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=10000, help="size of the seeded catalog")
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--only", help="comma-separated case names")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown, 0.10 = 10%%")
+    parser.add_argument("--json", help="also write the results here")
+    args = parser.parse_args()
+
+    database_url = temp_database_url()
+    os.environ["DATABASE_URL"] = database_url
+    os.environ["PASSWORD_HASH_WORKERS"] = "0"  # time the KDF itself, not the pool hand-off
+    seed_products(database_url, args.products)
+
+    from fastapi.testclient import TestClient
+    import main
+    import passwords
+
+    client = TestClient(main.app)
+    client.post("/register", json={"email": "bench@example.com", "username": "bench", "password": "benchpassword123"})
+    token = client.post("/login", params={"username": "bench", "password": "benchpassword123"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    cases = build_cases(client, main, passwords, headers, args.products)
+    if args.only:
+        unknown = set(args.only.split(",")) - set(cases)
+        if unknown:
+            parser.error(f"unknown cases: {', '.join(sorted(unknown))}")
+        cases = {name: case for name, case in cases.items() if name in args.only.split(",")}
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+
+    print(f"⏱️  Microbenchmarks on {args.products:,} products "
+          f"({args.rounds} rounds x {args.repeat} calls, threshold {args.threshold:.0%})")
+    results = {}
+    regressions = []
+    for name, case in cases.items():
+        repeat = min(args.repeat, SLOW_CASES.get(name, args.repeat))
+        key = f"{name}@{args.products}"
+        results[key] = result = measure(case, min(args.warmup, repeat), args.rounds, repeat)
+        line = f"  {name:<24} {result['us']:>10.1f} µs  (±{result['spread']:.1%})"
+        before = baseline.get(key)
+        if before:
+            change = result["us"] / before["us"] - 1
+            line += f"  baseline {before['us']:>10.1f} µs  {change:+7.1%}"
+            if change > args.threshold:
+                regressions.append(name)
+                line += "  ❌ regression"
+        print(line)
+
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        # Keep other sizes and cases already in the baseline
+        saved = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                saved = json.load(f)["results"]
+        report["results"] = dict(saved, **results)
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Baseline saved to {args.baseline}")
+    elif not baseline:
+        print(f"ℹ️  No baseline at {args.baseline}; run with --save-baseline to create one")
+
+    if regressions:
+        print(f"❌ {len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+Streaming bulk product import
+Reads CSV or NDJSON product rows from any iterable of lines or byte chunks and
+writes them in fixed-size batches: COPY FROM STDIN on PostgreSQL (psycopg2),
+executemany everywhere else. Rows whose name already exists update that
+product instead of inserting a new one. Memory use is bounded by the batch size,
+not the input size.
+
+CSV needs a header row; both formats use the ProductCreate fields:
+name, description, price, stock_quantity, category
+
+Usage: python bulk_import.py products.csv [--format csv|ndjson] [--batch-size 5000]
+       cat products.ndjson | python bulk_import.py - --format ndjson
+"""
+import argparse
+import codecs
+import csv
+import io
+import math
+import os
+import sys
+import time
+from datetime import datetime
+import orjson
+from sqlalchemy import select, bindparam
+
+# Environment variables
+PRODUCT_IMPORT_BATCH_SIZE = int(os.getenv("PRODUCT_IMPORT_BATCH_SIZE", "5000"))
+
+FORMATS = ("csv", "ndjson")
+MAX_REPORTED_ERRORS = 100
+COPY_COLUMNS = ("name", "description", "price", "stock_quantity", "category", "created_at")
+
+def iter_lines(chunks, encoding="utf-8"):
+    """Split an iterable of byte chunks into text lines, keeping the line endings."""
+    decoder = codecs.getincrementaldecoder(encoding)()
+    pending = ""
+    for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+def iter_records(lines, fmt):
+    """Yield (row number, record) pairs; records that can't be decoded are None."""
+    if fmt == "csv":
+        # csv pulls extra lines itself when a quoted field spans several
+        for row_number, record in enumerate(csv.DictReader(lines), start=1):
+            yield row_number, record
+        return
+    row_number = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            yield row_number, orjson.loads(line)
+        except orjson.JSONDecodeError:
+            yield row_number, None
+
+def parse_product(record) -> dict:
+    """Validate one record into product column values; raises ValueError with the reason."""
+    if not isinstance(record, dict):
+        raise ValueError("not a JSON object")
+    name = record.get("name")
+    if not isinstance(name, str) or not name.strip():
+        raise ValueError("name is required")
+    category = record.get("category")
+    if not isinstance(category, str) or not category.strip():
+        raise ValueError("category is required")
+    description = record.get("description")
+    if description is None:
+        description = ""
+    elif not isinstance(description, str):
+        raise ValueError("description must be a string")
+    try:
+        price = float(record.get("price"))
+    except (TypeError, ValueError):
+        raise ValueError("price must be a number")
+    if not math.isfinite(price) or price < 0:
+        raise ValueError("price must be a non-negative number")
+    stock = record.get("stock_quantity")
+    if isinstance(stock, float) and stock.is_integer():
+        stock = int(stock)
+    try:
+        stock_quantity = None if isinstance(stock, (bool, float)) else int(stock)
+    except (TypeError, ValueError):
+        stock_quantity = None
+    if stock_quantity is None or stock_quantity < 0:
+        raise ValueError("stock_quantity must be a non-negative integer")
+    return {"name": name.strip(), "description": description, "price": price,
+            "stock_quantity": stock_quantity, "category": category.strip()}
+
+def _copy_rows(db, table, rows) -> bool:
+    """COPY rows into the table on psycopg2 connections; False if COPY isn't available."""
+    driver_connection = db.connection().connection.driver_connection
+    cursor = driver_connection.cursor()
+    if not hasattr(cursor, "copy_expert"):
+        cursor.close()
+        return False
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([row[column] for column in COPY_COLUMNS])
+    buffer.seek(0)
+    with cursor:
+        cursor.copy_expert(
+            f"COPY {table.name} ({', '.join(COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer
+        )
+    return True
+
+def _write_batch(db, table, batch, report, categories):
+    # Later rows win when a name repeats within the batch
+    rows = {row["name"]: row for row in batch}
+    existing = db.execute(select(table.c.name, table.c.category).where(table.c.name.in_(rows))).all()
+    existing_names = set()
+    for name, category in existing:
+        existing_names.add(name)
+        categories.add(category)  # an update may move products out of this category
+
+    updates = []
+    inserts = []
+    created_at = datetime.utcnow()
+    for name, row in rows.items():
+        categories.add(row["category"])
+        if name in existing_names:
+            updates.append(dict(row, match_name=name))
+        else:
+            inserts.append(dict(row, created_at=created_at))
+
+    if updates:
+        db.execute(table.update().where(table.c.name == bindparam("match_name")), updates)
+    if inserts:
+        if db.get_bind().dialect.name != "postgresql" or not _copy_rows(db, table, inserts):
+            db.execute(table.insert(), inserts)
+    db.commit()
+    report["inserted"] += len(inserts)
+    report["updated"] += len(updates)
+
+def import_products(db, table, records, batch_size=PRODUCT_IMPORT_BATCH_SIZE, categories=None):
+    """Upsert (row number, record) pairs into the products table, committing every batch.
+
+    Returns the report dict and the set of categories whose counters need refreshing.
+    Pass your own `categories` set to still have them if a later batch raises.
+    """
+    report = {"rows": 0, "inserted": 0, "updated": 0, "rejected": 0, "errors": []}
+    categories = set() if categories is None else categories
+    batch = []
+    start = time.perf_counter()
+    for row_number, record in records:
+        report["rows"] += 1
+        try:
+            batch.append(parse_product(record))
+        except ValueError as e:
+            report["rejected"] += 1
+            if len(report["errors"]) < MAX_REPORTED_ERRORS:
+                report["errors"].append({"row": row_number, "error": str(e)})
+            continue
+        if len(batch) >= batch_size:
+            _write_batch(db, table, batch, report, categories)
+            batch = []
+    if batch:
+        _write_batch(db, table, batch, report, categories)
+    report["seconds"] = round(time.perf_counter() - start, 3)
+    report["rows_per_sec"] = round(report["rows"] / report["seconds"], 1) if report["seconds"] else 0.0
+    return report, categories
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="CSV or NDJSON file, or - for stdin")
+    parser.add_argument("--format", choices=FORMATS, help="defaults to the file extension")
+    parser.add_argument("--batch-size", type=int, default=PRODUCT_IMPORT_BATCH_SIZE)
+    parser.add_argument("--database-url", help="defaults to DATABASE_URL")
+    args = parser.parse_args()
+
+    fmt = args.format or ("csv" if args.path.lower().endswith(".csv") else "ndjson")
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    import main as app_module
+    app_module.ensure_database()
+
+    source = sys.stdin if args.path == "-" else open(args.path, newline="", encoding="utf-8")
+    print(f"📦 Importing products from {args.path} ({fmt}, batches of {args.batch_size})")
+    with source, app_module.SessionLocal() as db:
+        report = app_module.run_product_import(db, iter_records(source, fmt), args.batch_size)
+
+    print(f"✅ {report['rows']:,} rows in {report['seconds']}s ({report['rows_per_sec']:,} rows/s)")
+    print(f"  inserted {report['inserted']:,}, updated {report['updated']:,}, rejected {report['rejected']:,}")
+    for error in report["errors"][:10]:
+        print(f"  ❌ row {error['row']}: {error['error']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+In-process TTL + LRU cache for catalog reads
+Entries expire after `ttl` seconds and the least recently used entry is evicted
+once `maxsize` is reached. Each entry can carry a set of tags (e.g. product ids)
+so writes can invalidate exactly the entries that contain them.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+class TTLCache:
+    """Thread-safe bounded cache with TTL, LRU eviction and tag invalidation."""
+
+    def __init__(self, maxsize=1024, ttl=60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value, tags)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """Return the cached value or None, counting a hit or a miss."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, tags=(), ttl=None):
+        """Store a value, evicting least recently used entries past maxsize.
+
+        `ttl` shortens this entry's lifetime below the cache's own (never lengthens it).
+        """
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if self.maxsize <= 0 or ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value, frozenset(tags))
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        """Drop a single key."""
+        with self._lock:
+            if self._data.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def invalidate_where(self, predicate):
+        """Drop every entry for which predicate(key, value, tags) is true."""
+        with self._lock:
+            stale = [key for key, (_, value, tags) in self._data.items() if predicate(key, value, tags)]
+            for key in stale:
+                del self._data[key]
+            self.invalidations += len(stale)
+
+    def invalidate_tags(self, tags):
+        """Drop every entry tagged with any of `tags`."""
+        tags = set(tags)
+        self.invalidate_where(lambda key, value, entry_tags: not tags.isdisjoint(entry_tags))
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._data)
+            self._data.clear()
+
+    def stats(self):
+        """Counters for tuning maxsize and ttl."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
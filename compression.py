@@ -0,0 +1,182 @@
+"""
+Response compression
+An ASGI middleware that gzip- or brotli-compresses responses above a size
+threshold based on the client's Accept-Encoding, plus a helper that compresses
+static content once at startup instead of on every request.
+"""
+import gzip
+import os
+import zlib
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import Response
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "500"))
+GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "application/xml",
+                      "application/x-ndjson", "image/svg+xml")
+
+def available_encodings():
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+def negotiate_encoding(accept_encoding):
+    """Pick the best supported encoding from an Accept-Encoding header, or None."""
+    if not accept_encoding:
+        return None
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[name.strip().lower()] = quality
+    best, best_quality = None, 0.0
+    for encoding in available_encodings():  # in preference order, so ties keep the first
+        quality = weights.get(encoding, weights.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+def vary_on_encoding(headers):
+    """Add Vary: Accept-Encoding once, even when the response passes two of these middlewares."""
+    if "accept-encoding" not in headers.get("vary", "").lower():
+        headers.add_vary_header("Accept-Encoding")
+
+def weaken_etag(headers):
+    """A strong ETag names exact bytes, so a compressed variant may only carry a weak one."""
+    etag = headers.get("etag")
+    if etag and not etag.startswith("W/"):
+        headers["ETag"] = "W/" + etag
+
+class _StreamCompressor:
+    """Incremental compressor for streaming responses."""
+
+    def __init__(self, encoding):
+        if encoding == "br":
+            compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+            self._compress = compressor.process
+            self._flush = compressor.flush
+            self.finish = compressor.finish
+        else:
+            compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self._compress = compressor.compress
+            self._flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+            self.finish = compressor.flush
+
+    def chunk(self, data: bytes) -> bytes:
+        # Flush each chunk so streamed rows reach the client without waiting for the buffer
+        return self._compress(data) + self._flush()
+
+class CompressionMiddleware:
+    """Compress compressible responses of at least `minimum_size` bytes."""
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, compressor, passthrough
+            if message["type"] == "http.response.start":
+                if message["status"] == 304:
+                    # A 304 stands in for the 200 the client cached, which came through here as
+                    # well, so it must carry the same Vary and (weak) validator
+                    headers = MutableHeaders(raw=message["headers"])
+                    vary_on_encoding(headers)
+                    weaken_etag(headers)
+                    passthrough = True
+                    await send(message)
+                    return
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "")
+                passthrough = (
+                    "content-encoding" in headers
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                )
+                if passthrough:
+                    await send(message)
+                else:
+                    start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start_message is not None:
+                headers = MutableHeaders(raw=start_message["headers"])
+                vary_on_encoding(headers)
+                # Weak even when the body turns out too small to compress: a later 304 can't
+                # know the size and always carries the weak form
+                weaken_etag(headers)
+                if not more_body:
+                    # Whole body in one message: compress it if it is big enough
+                    if len(body) >= self.minimum_size:
+                        body = compress(body, encoding)
+                        headers["Content-Encoding"] = encoding
+                        headers["Content-Length"] = str(len(body))
+                    await send(start_message)
+                    start_message = None
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                # Streaming response: compress incrementally
+                compressor = _StreamCompressor(encoding)
+                headers["Content-Encoding"] = encoding
+                if "content-length" in headers:
+                    del headers["content-length"]
+                await send(start_message)
+                start_message = None
+
+            if compressor is None:
+                await send(message)
+                return
+            data = compressor.chunk(body) if body else b""
+            if not more_body:
+                data += compressor.finish()
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+class PrecompressedContent:
+    """Static content compressed once, served in the client's preferred encoding."""
+
+    def __init__(self, body, media_type: str):
+        self.body = body.encode() if isinstance(body, str) else body
+        self.media_type = media_type
+        self.variants = {encoding: compress(self.body, encoding) for encoding in available_encodings()}
+
+    def response(self, accept_encoding) -> Response:
+        encoding = negotiate_encoding(accept_encoding)
+        headers = {"Vary": "Accept-Encoding"}
+        if encoding is None:
+            return Response(content=self.body, media_type=self.media_type, headers=headers)
+        headers["Content-Encoding"] = encoding
+        return Response(content=self.variants[encoding], media_type=self.media_type, headers=headers)
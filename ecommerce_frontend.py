@@ -8,10 +8,13 @@ import requests
 import json
 import pandas as pd
 from datetime import datetime
+from urllib.parse import urlencode
 import time
+import uuid
 
 # Configuration
 API_BASE_URL = os.environ.get('API_BASE_URL', 'https://production-deployment-to-render.onrender.com')
+ORDERS_PAGE_SIZE = 20
 
 # Page configuration
 st.set_page_config(
@@ -70,13 +73,29 @@ if 'cart' not in st.session_state:
     st.session_state.cart = []
 if 'current_page' not in st.session_state:
     st.session_state.current_page = "home"
+if 'etag_cache' not in st.session_state:
+    st.session_state.etag_cache = {}
+if 'checkout' not in st.session_state:
+    st.session_state.checkout = None
+if 'order_history' not in st.session_state:
+    # Pages of GET /orders/page loaded so far: {"orders": [...], "next_cursor": ...}, or None
+    st.session_state.order_history = None
 
 def make_request(method, endpoint, data=None, headers=None):
     """Make API request with error handling"""
     url = f"{API_BASE_URL}{endpoint}"
     try:
         if method == "GET":
-            response = requests.get(url, headers=headers, timeout=10)
+            # Revalidate with the cached ETag; a 304 means our copy is still current
+            cached = st.session_state.etag_cache.get(endpoint)
+            request_headers = dict(headers or {})
+            if cached:
+                request_headers["If-None-Match"] = cached.headers["ETag"]
+            response = requests.get(url, headers=request_headers, timeout=10)
+            if response.status_code == 304 and cached:
+                return cached
+            if response.status_code == 200 and "ETag" in response.headers:
+                st.session_state.etag_cache[endpoint] = response
         elif method == "POST":
             response = requests.post(url, json=data, headers=headers, timeout=10)
         return response
@@ -151,6 +170,7 @@ with col4:
     if st.session_state.token:
         if st.button("📋 Orders"):
             st.session_state.current_page = "orders"
+            st.session_state.order_history = None
     else:
         if st.button("🔐 Login"):
             st.session_state.current_page = "auth"
@@ -161,6 +181,7 @@ with col5:
             st.session_state.token = None
             st.session_state.user_info = None
             st.session_state.cart = []
+            st.session_state.order_history = None
             st.session_state.current_page = "home"
             st.rerun()
 
@@ -182,16 +203,26 @@ if st.session_state.current_page == "home":
             with col1:
                 search_term = st.text_input("🔍 Search products...", placeholder="Enter product name or category")
             with col2:
-                categories = list(set([p['category'] for p in products]))
+                categories_response = make_request("GET", "/categories")
+                if categories_response and categories_response.status_code == 200:
+                    categories = [c['category'] for c in categories_response.json()]
+                else:
+                    categories = sorted(set(p['category'] for p in products))
                 selected_category = st.selectbox("📂 Category", ["All"] + categories)
             
             # Filter products
             filtered_products = products
             if search_term:
-                filtered_products = [p for p in filtered_products if 
-                                   search_term.lower() in p['name'].lower() or 
-                                   search_term.lower() in p['description'].lower()]
-            if selected_category != "All":
+                # Ranked full-text search runs on the server
+                params = {"q": search_term, "limit": 100}
+                if selected_category != "All":
+                    params["category"] = selected_category
+                search_response = make_request("GET", f"/products/search?{urlencode(params)}")
+                if search_response and search_response.status_code == 200:
+                    filtered_products = search_response.json()
+                else:
+                    filtered_products = []
+            elif selected_category != "All":
                 filtered_products = [p for p in filtered_products if p['category'] == selected_category]
             
             # Display products in grid
@@ -282,14 +313,24 @@ elif st.session_state.current_page == "cart":
                     for item in st.session_state.cart
                 ]
                 
+                # Reuse the same Idempotency-Key when retrying the same cart, so a click
+                # after a timeout can't create a duplicate order
+                checkout = st.session_state.checkout
+                if checkout is None or checkout["items"] != order_items:
+                    checkout = {"items": order_items, "key": str(uuid.uuid4())}
+                    st.session_state.checkout = checkout
+                headers = dict(get_auth_headers(), **{"Idempotency-Key": checkout["key"]})
+                
                 # Create order
                 response = make_request("POST", "/orders", 
                                       {"items": order_items}, 
-                                      get_auth_headers())
+                                      headers)
                 
                 if response and response.status_code == 200:
                     st.success("🎉 Order placed successfully!")
                     st.session_state.cart = []
+                    st.session_state.checkout = None
+                    st.session_state.order_history = None
                     st.session_state.current_page = "orders"
                     time.sleep(1)
                     st.rerun()
@@ -311,9 +352,17 @@ elif st.session_state.current_page == "orders":
     st.header("📋 My Orders")
     
     if st.session_state.token:
-        response = make_request("GET", "/orders", headers=get_auth_headers())
-        if response and response.status_code == 200:
-            orders = response.json()
+        # One page of history at a time instead of every order the user ever placed
+        history = st.session_state.order_history
+        if history is None:
+            response = make_request("GET", f"/orders/page?{urlencode({'limit': ORDERS_PAGE_SIZE})}", headers=get_auth_headers())
+            if response and response.status_code == 200:
+                page = response.json()
+                history = {"orders": page["items"], "next_cursor": page["next_cursor"]}
+                st.session_state.order_history = history
+        
+        if history is not None:
+            orders = history["orders"]
             
             if orders:
                 for order in orders:
@@ -325,6 +374,19 @@ elif st.session_state.current_page == "orders":
                         st.write("**Items:**")
                         for item in order['items']:
                             st.write(f"- Product ID {item['product_id']}: {item['quantity']} × ${item['price']:.2f}")
+                
+                if history["next_cursor"] and st.button("⬇️ Load older orders"):
+                    response = make_request(
+                        "GET", f"/orders/page?{urlencode({'limit': ORDERS_PAGE_SIZE, 'cursor': history['next_cursor']})}",
+                        headers=get_auth_headers()
+                    )
+                    if response and response.status_code == 200:
+                        page = response.json()
+                        history["orders"].extend(page["items"])
+                        history["next_cursor"] = page["next_cursor"]
+                        st.rerun()
+                    else:
+                        st.error("❌ Unable to load more orders.")
             else:
                 st.info("📦 No orders found. Place your first order!")
         else:
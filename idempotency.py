@@ -0,0 +1,124 @@
+"""
+Idempotency keys for order creation
+A request carrying an Idempotency-Key claims (user, key) by inserting a
+pending row in its own short transaction. The route records its response in
+that row inside the transaction that creates the order, so a stored response
+exists exactly when the order does. Retries with the same key replay the
+stored response; duplicates that arrive while the first request is still
+running wait for it instead of doing the work twice.
+"""
+import asyncio
+import hashlib
+import os
+import time
+from datetime import datetime, timedelta
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from starlette.responses import Response
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+# Environment variables
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", str(24 * 3600)))
+# How long a duplicate waits for the original request before giving up with 409
+IDEMPOTENCY_WAIT_TIMEOUT = float(os.getenv("IDEMPOTENCY_WAIT_TIMEOUT", "15"))
+# A pending claim older than this is assumed abandoned (worker crashed) and taken over
+IDEMPOTENCY_LOCK_TIMEOUT = float(os.getenv("IDEMPOTENCY_LOCK_TIMEOUT", "60"))
+
+POLL_INTERVAL = 0.05
+PURGE_INTERVAL = 60.0
+
+_last_purge = 0.0
+
+def request_fingerprint(path: str, body: bytes) -> str:
+    """Hash of what the request asks for, to reject a key reused for a different request."""
+    return hashlib.sha256(path.encode() + b"\n" + body).hexdigest()
+
+class IdempotencyClaim:
+    """A request's hold on one (user, key) pair.
+
+    `replay` is set instead when an earlier request with the key already finished.
+    Without a key (`key=None`) every method is a no-op, so routes needn't special-case it.
+    """
+
+    def __init__(self, engine, table, user_id, key=None, replay=None):
+        self.engine = engine
+        self.table = table
+        self.user_id = user_id
+        self.key = key
+        self.replay = replay
+        self.recorded = False
+
+    @property
+    def owned(self):
+        return self.key is not None and self.replay is None
+
+    def _where(self):
+        return (self.table.c.user_id == self.user_id) & (self.table.c.idempotency_key == self.key)
+
+    def record(self, db, body: bytes, status_code: int = 200):
+        """Store the response in the caller's transaction; commit it together with the order."""
+        if not self.owned:
+            return
+        db.execute(update(self.table).where(self._where()).values(status_code=status_code, response_body=body))
+        self.recorded = True
+
+    def release(self):
+        """Give the key up so a retry runs the request again."""
+        with self.engine.begin() as conn:
+            conn.execute(delete(self.table).where(self._where(), self.table.c.status_code.is_(None)))
+
+def replay_response(row) -> Response:
+    return Response(content=row.response_body, status_code=row.status_code, media_type="application/json",
+                    headers={"Idempotent-Replayed": "true"})
+
+def _purge_expired(conn, table, now):
+    global _last_purge
+    if time.monotonic() - _last_purge >= PURGE_INTERVAL:
+        _last_purge = time.monotonic()
+        conn.execute(delete(table).where(table.c.expires_at < now))
+
+def _try_claim(engine, table, user_id, key, fingerprint):
+    """Insert a pending row; None means we now own the key, False means try again, else the existing row."""
+    now = datetime.utcnow()
+    upsert = pg_insert if engine.dialect.name == "postgresql" else sqlite_insert
+    with engine.begin() as conn:
+        _purge_expired(conn, table, now)
+        where = (table.c.user_id == user_id) & (table.c.idempotency_key == key)
+        inserted = conn.execute(upsert(table).values(
+            user_id=user_id, idempotency_key=key, fingerprint=fingerprint,
+            created_at=now, expires_at=now + timedelta(seconds=IDEMPOTENCY_TTL),
+        ).on_conflict_do_nothing(index_elements=["user_id", "idempotency_key"])).rowcount
+        if inserted:
+            return None
+        row = conn.execute(select(table).where(where)).first()
+        if row is None:
+            return False  # deleted between our insert and select; try again
+        stale = row.expires_at < now or (
+            row.status_code is None and row.created_at < now - timedelta(seconds=IDEMPOTENCY_LOCK_TIMEOUT)
+        )
+        if stale:
+            conn.execute(delete(table).where(where, table.c.created_at == row.created_at))
+            return False
+        return row
+
+async def claim_key(engine, table, user_id: int, key: str, fingerprint: str) -> IdempotencyClaim:
+    """Claim a key for this request, or get the replayed response of an earlier one.
+
+    Waits while another request holds the key; raises 422 if the key was used for a
+    different request and 409 if the holder doesn't finish within IDEMPOTENCY_WAIT_TIMEOUT.
+    """
+    deadline = time.monotonic() + IDEMPOTENCY_WAIT_TIMEOUT
+    while True:
+        row = await run_in_threadpool(_try_claim, engine, table, user_id, key, fingerprint)
+        if row is None:
+            return IdempotencyClaim(engine, table, user_id, key)
+        if row is not False:
+            if row.fingerprint != fingerprint:
+                raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+            if row.status_code is not None:
+                return IdempotencyClaim(engine, table, user_id, key, replay=replay_response(row))
+            if time.monotonic() >= deadline:
+                raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+            await asyncio.sleep(POLL_INTERVAL)
@@ -2,20 +2,41 @@
 E-commerce FastAPI Application for Render Deployment
 """
 import os
-from fastapi import FastAPI, HTTPException, Depends, status
+import time
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, Header, Request, Response, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, EmailStr
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, EmailStr, Field
 from typing import List, Optional
 import uvicorn
 from datetime import datetime, timedelta
 import jwt
+import orjson
 import hashlib
 import secrets
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, ForeignKey, Boolean
+import base64
+import json
+from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, ForeignKey, Boolean, LargeBinary, Index, update, case, insert, delete, select, func, tuple_, false
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session, relationship
+from sqlalchemy.orm import sessionmaker, Session, relationship, selectinload
+from sqlalchemy.exc import OperationalError, ProgrammingError
 import logging
+from db_pool import pool_options, pool_status
+from cache import TTLCache
+from compression import CompressionMiddleware
+import metrics
+import sql_trace
+from search import ensure_search_index, detect_search_backend, search_products, SEARCH_DDL
+import passwords
+from anyio import from_thread
+from bulk_import import iter_lines, iter_records, import_products, PRODUCT_IMPORT_BATCH_SIZE
+from export import stream_rows, stream_orders, MEDIA_TYPES as EXPORT_MEDIA_TYPES
+from idempotency import IdempotencyClaim, claim_key, request_fingerprint
+from passwords import hash_password_async, verify_password_async, needs_rehash
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -26,25 +47,27 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here")
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./ecommerce.db")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+PRODUCT_CACHE_SIZE = int(os.getenv("PRODUCT_CACHE_SIZE", "1024"))
+PRODUCT_LIST_CACHE_SIZE = int(os.getenv("PRODUCT_LIST_CACHE_SIZE", "256"))
+PRODUCT_CACHE_TTL = float(os.getenv("PRODUCT_CACHE_TTL", "30"))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "4096"))
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "60"))
+ORDER_BATCH_MAX_ORDERS = int(os.getenv("ORDER_BATCH_MAX_ORDERS", "5000"))
+ORDER_BATCH_RESERVE_ATTEMPTS = 3
+# Bring the schema up to date in a startup hook; set to false when `python init_database.py --schema-only`
+# runs as a release step, so workers start without touching the database
+DB_AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "true").lower() in ("1", "true", "yes")
 
-# FastAPI app
-app = FastAPI(
-    title="E-commerce API",
-    description="A production-ready e-commerce API deployed on Render",
-    version="1.0.0"
-)
+# API routes; create_app() at the bottom builds the FastAPI app that serves them
+router = APIRouter()
 
-# CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+def stop_password_workers():
+    """Stop the password hashing processes with the server."""
+    passwords.shutdown()
 
 # Database setup
-engine = create_engine(DATABASE_URL)
+engine = create_engine(DATABASE_URL, **pool_options(DATABASE_URL))
+sql_trace.instrument(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -74,6 +97,11 @@ class Product(Base):
     
     order_items = relationship("OrderItem", back_populates="product")
 
+    __table_args__ = (
+        # Serves category-filtered keyset pages (WHERE category = ? AND id > ? ORDER BY id)
+        Index("ix_products_category_id", "category", "id"),
+    )
+
 class Order(Base):
     __tablename__ = "orders"
     
@@ -85,12 +113,15 @@ class Order(Base):
     
     user = relationship("User", back_populates="orders")
     items = relationship("OrderItem", back_populates="order")
+    
+    # Order history is read per user, newest first
+    __table_args__ = (Index("ix_orders_user_id_created_at", "user_id", "created_at"),)
 
 class OrderItem(Base):
     __tablename__ = "order_items"
     
     id = Column(Integer, primary_key=True, index=True)
-    order_id = Column(Integer, ForeignKey("orders.id"))
+    order_id = Column(Integer, ForeignKey("orders.id"), index=True)
     product_id = Column(Integer, ForeignKey("products.id"))
     quantity = Column(Integer)
     price = Column(Float)
@@ -98,8 +129,188 @@ class OrderItem(Base):
     order = relationship("Order", back_populates="items")
     product = relationship("Product", back_populates="order_items")
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+class CategoryStats(Base):
+    __tablename__ = "category_stats"
+    
+    category = Column(String, primary_key=True)
+    product_count = Column(Integer, nullable=False, default=0)
+    in_stock_count = Column(Integer, nullable=False, default=0)
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    idempotency_key = Column(String(255), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)
+    status_code = Column(Integer)  # NULL while the first request is still running
+    response_body = Column(LargeBinary)
+    created_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+class SchemaVersion(Base):
+    __tablename__ = "schema_version"
+    
+    fingerprint = Column(String(64), primary_key=True)
+    applied_at = Column(DateTime, nullable=False)
+
+def category_stats_upsert(dialect_name: str, deltas: dict):
+    """INSERT ... ON CONFLICT statement adding {category: (products, in_stock)} deltas to the counters."""
+    upsert = pg_insert if dialect_name == "postgresql" else sqlite_insert
+    stmt = upsert(CategoryStats).values([
+        {"category": category, "product_count": products, "in_stock_count": in_stock}
+        for category, (products, in_stock) in deltas.items()
+    ])
+    return stmt.on_conflict_do_update(
+        index_elements=[CategoryStats.category],
+        set_={
+            "product_count": CategoryStats.product_count + stmt.excluded.product_count,
+            "in_stock_count": CategoryStats.in_stock_count + stmt.excluded.in_stock_count,
+        },
+    )
+
+def stock_change_deltas(rows, quantities: dict) -> dict:
+    """Category in-stock deltas for (id, category, new_stock) rows after removing `quantities`."""
+    deltas = {}
+    for product_id, category, new_stock in rows:
+        old_stock = new_stock + quantities[product_id]
+        change = (new_stock > 0) - (old_stock > 0)
+        if change and category is not None:
+            deltas[category] = (0, deltas.get(category, (0, 0))[1] + change)
+    return deltas
+
+def reserve_stock_statement(quantities: dict):
+    """Conditional UPDATE taking {product_id: quantity} out of stock, RETURNING (id, category, stock).
+
+    Rows only match while they still hold enough stock, so concurrent checkouts can't
+    oversell and no row is locked before the write itself. Fewer rows back than products
+    asked for means one fell short. Shared by the sync and async apps.
+    """
+    needed = case(quantities, value=Product.id)
+    return (
+        update(Product)
+        .where(Product.id.in_(quantities), Product.stock_quantity >= needed)
+        .values(stock_quantity=Product.stock_quantity - needed)
+        .returning(Product.id, Product.category, Product.stock_quantity)
+        .execution_options(synchronize_session=False)
+    )
+
+def sold_out_upsert(dialect_name: str, reserved, quantities: dict):
+    """Category counter update for products a reservation just sold out, or None if there were none."""
+    deltas = stock_change_deltas(reserved, quantities)
+    return category_stats_upsert(dialect_name, deltas) if deltas else None
+
+def reserve_stock(db: Session, quantities: dict) -> bool:
+    """Take {product_id: quantity} out of stock with reserve_stock_statement().
+
+    Returns False, with nothing to commit, when any product fell short; the caller
+    should roll back.
+    """
+    if not quantities:
+        return True
+    reserved = db.execute(reserve_stock_statement(quantities)).all()
+    if len(reserved) != len(quantities):
+        return False
+
+    # Products that just sold out leave their category's in-stock count
+    upsert = sold_out_upsert(db.get_bind().dialect.name, reserved, quantities)
+    if upsert is not None:
+        db.execute(upsert)
+    return True
+
+def allocate_ids(db: Session, table, count: int) -> list:
+    """Reserve `count` primary keys for rows this transaction inserts with explicit ids.
+
+    PostgreSQL draws them from the table's serial sequence. SQLite allows one writer at a
+    time: a no-op UPDATE takes the write lock first, so the ids after max(id) stay ours
+    until commit even when the transaction hasn't written anything yet.
+    """
+    if not count:
+        return []
+    if db.get_bind().dialect.name == "postgresql":
+        sequence = func.pg_get_serial_sequence(table.name, "id")
+        return db.execute(select(func.nextval(sequence)).select_from(func.generate_series(1, count))).scalars().all()
+    db.execute(update(table).where(false()).values(id=table.c.id))
+    first_id = (db.execute(select(func.max(table.c.id))).scalar() or 0) + 1
+    return list(range(first_id, first_id + count))
+
+def refresh_category_stats(db: Session, categories=None):
+    """Recompute category counters from the products table, for all or only the given categories."""
+    counts = select(
+        Product.category,
+        func.count(Product.id),
+        func.sum(case((Product.stock_quantity > 0, 1), else_=0)),
+    ).where(Product.category.isnot(None)).group_by(Product.category)
+    clear = delete(CategoryStats)
+    if categories is not None:
+        categories = list(categories)
+        if not categories:
+            return
+        counts = counts.where(Product.category.in_(categories))
+        clear = clear.where(CategoryStats.category.in_(categories))
+    db.execute(clear)
+    db.execute(insert(CategoryStats).from_select(["category", "product_count", "in_stock_count"], counts))
+
+def ensure_schema(bind):
+    """Create tables, plus the indexes and derived data create_all doesn't cover."""
+    Base.metadata.create_all(bind=bind)
+    # create_all only creates indexes together with new tables
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
+    with Session(bind) as db:
+        if db.query(CategoryStats).first() is None and db.query(Product.id).first() is not None:
+            refresh_category_stats(db)
+            db.commit()
+
+def schema_fingerprint() -> str:
+    """Hash of the declared tables, columns and indexes plus the search index DDL."""
+    parts = list(SEARCH_DDL)
+    for table in Base.metadata.sorted_tables:
+        columns = ",".join(f"{column.name}:{column.type!r}" for column in table.columns)
+        indexes = ",".join(sorted(f"{index.name}({','.join(index.columns.keys())})" for index in table.indexes))
+        parts.append(f"{table.name}[{columns}][{indexes}]")
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+def migrate(bind=engine):
+    """Create missing tables, indexes and the search index, then record the schema fingerprint."""
+    ensure_schema(bind)
+    ensure_search_index(bind)
+    with Session(bind) as db:
+        db.execute(delete(SchemaVersion))
+        db.add(SchemaVersion(fingerprint=schema_fingerprint(), applied_at=datetime.utcnow()))
+        db.commit()
+
+def schema_is_current(bind=engine) -> bool:
+    """One query: does the database record the fingerprint of the current models?"""
+    try:
+        with bind.connect() as conn:
+            return conn.execute(select(SchemaVersion.fingerprint)).scalar() == schema_fingerprint()
+    except (OperationalError, ProgrammingError):  # schema_version doesn't exist yet
+        return False
+
+def ensure_database(bind=engine) -> bool:
+    """Migrate unless the schema is already current; True if it migrated."""
+    if schema_is_current(bind):
+        return False
+    migrate(bind)
+    return True
+
+# Detected on first search rather than at import, so startup needs no query for it
+_search_backend = None
+
+def search_backend():
+    global _search_backend
+    if _search_backend is None:
+        _search_backend = detect_search_backend(engine)
+    return _search_backend
+
+async def prepare_database():
+    """Bring the schema up to date once: a single query when it already is."""
+    if not DB_AUTO_MIGRATE:
+        return
+    start = time.perf_counter()
+    if await run_in_threadpool(ensure_database):
+        logger.info(f"Database schema migrated in {(time.perf_counter() - start) * 1000:.0f} ms")
 
 # Pydantic models
 class UserCreate(BaseModel):
@@ -136,6 +347,15 @@ class ProductResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class ProductPage(BaseModel):
+    items: List[ProductResponse]
+    next_cursor: Optional[str] = None
+
+class CategoryResponse(BaseModel):
+    category: str
+    product_count: int
+    in_stock_count: int
+
 class OrderItemCreate(BaseModel):
     product_id: int
     quantity: int
@@ -163,6 +383,37 @@ class OrderResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class OrderPage(BaseModel):
+    items: List[OrderResponse]
+    next_cursor: Optional[str] = None
+
+class OrderBatchCreate(BaseModel):
+    orders: List[OrderCreate] = Field(..., max_length=ORDER_BATCH_MAX_ORDERS)
+
+class OrderBatchResult(BaseModel):
+    index: int
+    status_code: int
+    order: Optional[OrderResponse] = None
+    error: Optional[str] = None
+
+class OrderBatchResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[OrderBatchResult]
+
+class ImportRejection(BaseModel):
+    row: int
+    error: str
+
+class ImportReport(BaseModel):
+    rows: int
+    inserted: int
+    updated: int
+    rejected: int
+    seconds: float
+    rows_per_sec: float
+    errors: List[ImportRejection]
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -170,13 +421,79 @@ class Token(BaseModel):
 # Security
 security = HTTPBearer()
 
-def get_password_hash(password: str) -> str:
-    """Hash a password for storing."""
-    return hashlib.sha256(password.encode()).hexdigest()
+# Verified principals keyed by JWT signature, so authenticated requests skip the users
+# table. An entry never outlives its token's exp. Entries are tagged with the user id for
+# invalidate_user(); other workers only notice a deactivation once their entry's TTL runs out.
+principal_cache = TTLCache(maxsize=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL)
+
+def invalidate_user(user_id: int):
+    """Forget every cached principal of a user, e.g. after deactivation."""
+    principal_cache.invalidate_tags([("user", user_id)])
+
+# Fast serialization path for list endpoints: rows are read as plain column tuples and
+# dumped with orjson into the exact shape of ProductResponse/OrderResponse, skipping the
+# per-row pydantic validation that response_model would do. The route decorators keep
+# response_model so the OpenAPI schema is unchanged.
+PRODUCT_COLUMNS = (
+    Product.id, Product.name, Product.description, Product.price,
+    Product.stock_quantity, Product.category, Product.created_at,
+)
+PRODUCT_FIELDS = tuple(column.key for column in PRODUCT_COLUMNS)
+
+def product_rows(rows):
+    """Turn PRODUCT_COLUMNS tuples into ProductResponse-shaped dicts."""
+    return [dict(zip(PRODUCT_FIELDS, row)) for row in rows]
+
+def order_row(order: Order):
+    """OrderResponse-shaped dict for an order and its items."""
+    return {
+        "id": order.id,
+        "user_id": order.user_id,
+        "total_amount": order.total_amount,
+        "status": order.status,
+        "created_at": order.created_at,
+        "items": [
+            {"id": item.id, "product_id": item.product_id, "quantity": item.quantity, "price": item.price}
+            for item in order.items
+        ],
+    }
+
+# Catalog read-through caches. Entries are (json body, etag) pairs. Single products are keyed
+# by id; list pages are tagged with the ids they contain, plus "tail" when they are the last
+# page and could gain newly created products. Each worker has its own copy, so TTL bounds
+# cross-worker staleness.
+product_cache = TTLCache(maxsize=PRODUCT_CACHE_SIZE, ttl=PRODUCT_CACHE_TTL)
+product_list_cache = TTLCache(maxsize=PRODUCT_LIST_CACHE_SIZE, ttl=PRODUCT_CACHE_TTL)
+
+def product_page_tags(products, is_last_page):
+    """Invalidation tags for a cached list page."""
+    tags = {product["id"] for product in products}
+    if is_last_page:
+        tags.add("tail")
+    return tags
+
+def compute_etag(body: bytes) -> str:
+    """Strong ETag for a serialized response body."""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag (weak comparison, per RFC 9110)."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+def conditional_response(body: bytes, etag: str, if_none_match: Optional[str]):
+    """Answer 304 when the client's copy is current, otherwise the JSON body with its ETag."""
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against its hash."""
-    return get_password_hash(plain_password) == hashed_password
+def invalidate_products(product_ids):
+    """Drop cached entries for products whose data changed."""
+    for product_id in product_ids:
+        product_cache.invalidate(product_id)
+    product_list_cache.invalidate_tags(product_ids)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create a JWT access token."""
@@ -189,6 +506,22 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def encode_cursor(values: dict) -> str:
+    """Encode keyset pagination state as an opaque URL-safe cursor."""
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> dict:
+    """Decode a cursor produced by encode_cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, dict):
+            raise ValueError(cursor)
+        return values
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 def get_db():
     """Database dependency."""
     db = SessionLocal()
@@ -197,36 +530,77 @@ def get_db():
     finally:
         db.close()
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
-    """Get current authenticated user."""
+def credentials_exception(detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+def decode_access_token(token: str) -> dict:
+    """Verify a bearer token and return its claims; 401 for bad or deactivated-user tokens."""
     try:
-        token = credentials.credentials
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Could not validate credentials",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
     except jwt.PyJWTError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
-    user = db.query(User).filter(User.username == username).first()
-    if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        raise credentials_exception("Could not validate credentials")
+    if payload.get("sub") is None:
+        raise credentials_exception("Could not validate credentials")
+    if payload.get("act") is False:
+        raise credentials_exception("Inactive user")
+    return payload
+
+def user_lookup(payload: dict):
+    """Statement loading the token's user: by id, or by username for older tokens without one."""
+    if "uid" in payload:
+        return select(User).where(User.id == payload["uid"])
+    return select(User).where(User.username == payload["sub"])
+
+def check_token_user(user, payload: dict):
+    """401 unless the looked-up user exists, still has the token's username and is active."""
+    if user is None or user.username != payload["sub"]:
+        raise credentials_exception("User not found")
+    if not user.is_active:
+        raise credentials_exception("Inactive user")
     return user
 
+def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+    """Get current authenticated user."""
+    token = credentials.credentials
+    signature = token.rpartition(".")[2]
+    # Entries expire with their token (see below), so a cached principal is always still valid
+    principal = principal_cache.get(signature)
+    if principal is not None:
+        return principal
+
+    payload = decode_access_token(token)
+    user = check_token_user(db.execute(user_lookup(payload)).scalars().first(), payload)
+    
+    principal = UserResponse.model_validate(user)
+    # exp is seconds since the epoch (UTC), so compare it with time.time(), never a naive datetime
+    principal_cache.set(signature, principal, tags=[("user", user.id)], ttl=payload["exp"] - time.time())
+    return principal
+
+async def idempotency_claim(
+    request: Request,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
+    current_user: User = Depends(get_current_user)
+):
+    """Claim the request's Idempotency-Key (if it sent one) for the duration of the request."""
+    if not idempotency_key:
+        yield IdempotencyClaim(engine, IdempotencyKey.__table__, current_user.id)
+        return
+    fingerprint = request_fingerprint(request.url.path, await request.body())
+    claim = await claim_key(engine, IdempotencyKey.__table__, current_user.id, idempotency_key, fingerprint)
+    try:
+        yield claim
+    finally:
+        # Only a committed order stores a response; any error (out of stock, unknown product,
+        # a lost race) frees the key so a retry with it runs again
+        if claim.owned and not claim.recorded:
+            await run_in_threadpool(claim.release)
+
 # Routes
-@app.get("/")
+# JSON root, left out by apps that serve their own page at / (see create_app)
 def read_root():
     """Health check endpoint."""
     return {
@@ -235,18 +609,43 @@ def read_root():
         "timestamp": datetime.utcnow().isoformat()
     }
 
-@app.get("/health")
+@router.get("/health")
 def health_check():
     """Health check for monitoring."""
     return {"status": "healthy", "timestamp": datetime.utcnow().isoformat()}
 
-@app.post("/register", response_model=UserResponse)
-def register(user: UserCreate, db: Session = Depends(get_db)):
+@router.get("/stats/pool")
+def database_pool_stats():
+    """Connection pool gauges and checkout wait/timeout counters."""
+    return pool_status(engine)
+
+@router.get("/stats/cache")
+def catalog_cache_stats():
+    """Hit, miss and eviction counters for the catalog and principal caches."""
+    return {"products": product_cache.stats(), "product_lists": product_list_cache.stats(),
+            "principals": principal_cache.stats()}
+
+@metrics.REGISTRY.add_collector
+def collect_pool_and_cache_metrics():
+    return metrics.pool_metrics(pool_status(engine)) + metrics.cache_metrics(
+        {"products": product_cache, "product_lists": product_list_cache, "principals": principal_cache}
+    )
+
+# async so rendering runs on the event loop, which is the only writer of the request counters
+@router.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus text exposition of request, DB pool and cache metrics."""
+    return metrics.metrics_response()
+
+# register and login are async so the password KDF runs in the passwords worker pool
+# without holding a threadpool thread; their database calls still go to the threadpool.
+@router.post("/register", response_model=UserResponse)
+async def register(user: UserCreate, db: Session = Depends(get_db)):
     """Register a new user."""
     # Check if user already exists
-    db_user = db.query(User).filter(
+    db_user = await run_in_threadpool(db.query(User).filter(
         (User.email == user.email) | (User.username == user.username)
-    ).first()
+    ).first)
     if db_user:
         raise HTTPException(
             status_code=400,
@@ -254,24 +653,24 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Create new user
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await hash_password_async(user.password)
     db_user = User(
         email=user.email,
         username=user.username,
         hashed_password=hashed_password
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await run_in_threadpool(db.commit)
+    await run_in_threadpool(db.refresh, db_user)
     
     logger.info(f"New user registered: {user.username}")
     return db_user
 
-@app.post("/login", response_model=Token)
-def login(username: str, password: str, db: Session = Depends(get_db)):
+@router.post("/login", response_model=Token)
+async def login(username: str, password: str, db: Session = Depends(get_db)):
     """Login user and return access token."""
-    user = db.query(User).filter(User.username == username).first()
-    if not user or not verify_password(password, user.hashed_password):
+    user = await run_in_threadpool(db.query(User).filter(User.username == username).first)
+    if not user or not await verify_password_async(password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -280,101 +679,397 @@ def login(username: str, password: str, db: Session = Depends(get_db)):
     
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
+        data={"sub": user.username, "uid": user.id, "act": user.is_active}, expires_delta=access_token_expires
     )
     
+    # Upgrade legacy SHA-256 hashes (and older work factors) now that we have the password
+    if needs_rehash(user.hashed_password):
+        user.hashed_password = await hash_password_async(password)
+        await run_in_threadpool(db.commit)
+        logger.info(f"Password hash upgraded: {username}")
+    
     logger.info(f"User logged in: {username}")
     return {"access_token": access_token, "token_type": "bearer"}
 
-@app.get("/users/me", response_model=UserResponse)
+@router.get("/users/me", response_model=UserResponse)
 def read_users_me(current_user: User = Depends(get_current_user)):
     """Get current user information."""
     return current_user
 
-@app.post("/products", response_model=ProductResponse)
+@router.post("/users/me/deactivate", response_model=UserResponse)
+def deactivate_users_me(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+    """Deactivate the current user; their tokens stop working immediately."""
+    user = db.get(User, current_user.id)
+    user.is_active = False
+    db.commit()
+    db.refresh(user)
+    invalidate_user(user.id)
+    
+    logger.info(f"User deactivated: {user.username}")
+    return user
+
+@router.post("/products", response_model=ProductResponse)
 def create_product(product: ProductCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     """Create a new product."""
     db_product = Product(**product.dict())
     db.add(db_product)
+    db.execute(category_stats_upsert(engine.dialect.name, {
+        product.category: (1, 1 if product.stock_quantity > 0 else 0)
+    }))
     db.commit()
     db.refresh(db_product)
     
+    # A new product can only appear on the last page of any listing, but anywhere in search results
+    product_list_cache.invalidate_tags(["tail", "search"])
+    
     logger.info(f"New product created: {product.name} by user {current_user.username}")
     return db_product
 
-@app.get("/products", response_model=List[ProductResponse])
-def read_products(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def run_product_import(db: Session, records, batch_size: int = PRODUCT_IMPORT_BATCH_SIZE) -> dict:
+    """Import (row number, record) pairs, then bring category counters and caches up to date."""
+    categories = set()
+    try:
+        report, _ = import_products(db, Product.__table__, records, batch_size, categories)
+    finally:
+        # Batches commit as they go, so catch up with what was written even when a later batch
+        # failed (client disconnect, DB error); the counters are incremental and would stay wrong
+        db.rollback()
+        product_cache.clear()
+        product_list_cache.clear()
+        refresh_category_stats(db, categories)
+        db.commit()
+    logger.info(f"Product import: {report['inserted']} inserted, {report['updated']} updated, {report['rejected']} rejected")
+    return report
+
+@router.post("/products/import", response_model=ImportReport)
+async def import_products_endpoint(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(csv|ndjson)$"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Stream a CSV or NDJSON request body into the catalog, upserting products by name."""
+    body = request.stream().__aiter__()
+
+    def chunks():
+        # Runs in the worker thread, pulling body chunks from the event loop as the import needs them
+        while True:
+            try:
+                yield from_thread.run(body.__anext__)
+            except StopAsyncIteration:
+                return
+
+    records = iter_records(iter_lines(chunks()), format)
+    return await run_in_threadpool(run_product_import, db, records)
+
+@router.get("/categories", response_model=List[CategoryResponse])
+def read_categories(if_none_match: Optional[str] = Header(None), db: Session = Depends(get_db)):
+    """Get product categories with product and in-stock counts."""
+    rows = db.query(CategoryStats.category, CategoryStats.product_count, CategoryStats.in_stock_count) \
+        .filter(CategoryStats.product_count > 0).order_by(CategoryStats.category).all()
+    body = orjson.dumps([
+        {"category": category, "product_count": products, "in_stock_count": in_stock}
+        for category, products, in_stock in rows
+    ])
+    return conditional_response(body, compute_etag(body), if_none_match)
+
+@router.get("/products", response_model=List[ProductResponse])
+def read_products(
+    skip: int = 0,
+    limit: int = 100,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
     """Get all products."""
-    products = db.query(Product).offset(skip).limit(limit).all()
-    return products
+    key = ("offset", skip, limit)
+    entry = product_list_cache.get(key)
+    if entry is None:
+        rows = db.query(*PRODUCT_COLUMNS).order_by(Product.id).offset(skip).limit(limit).all()
+        products = product_rows(rows)
+        body = orjson.dumps(products)
+        entry = (body, compute_etag(body))
+        product_list_cache.set(key, entry, product_page_tags(products, is_last_page=len(products) < limit))
+    return conditional_response(*entry, if_none_match)
+
+@router.get("/products/page", response_model=ProductPage)
+def read_products_page(
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    category: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """Get products with keyset pagination; pass `next_cursor` back to get the next page."""
+    after_id = 0
+    if cursor:
+        position = decode_cursor(cursor)
+        if position.get("category") != category or not isinstance(position.get("id"), int):
+            raise HTTPException(status_code=400, detail="Cursor does not match this query")
+        after_id = position["id"]
+
+    key = ("keyset", category, after_id, limit)
+    entry = product_list_cache.get(key)
+    if entry is None:
+        query = db.query(*PRODUCT_COLUMNS).filter(Product.id > after_id)
+        if category is not None:
+            query = query.filter(Product.category == category)
 
-@app.get("/products/{product_id}", response_model=ProductResponse)
-def read_product(product_id: int, db: Session = Depends(get_db)):
+        # Fetch one extra row to know whether another page exists
+        products = product_rows(query.order_by(Product.id).limit(limit + 1).all())
+        next_cursor = None
+        if len(products) > limit:
+            products = products[:limit]
+            next_cursor = encode_cursor({"category": category, "id": products[-1]["id"]})
+        body = orjson.dumps({"items": products, "next_cursor": next_cursor})
+        entry = (body, compute_etag(body))
+        product_list_cache.set(key, entry, product_page_tags(products, is_last_page=next_cursor is None))
+    return conditional_response(*entry, if_none_match)
+
+@router.get("/products/search", response_model=List[ProductResponse])
+def search_products_endpoint(
+    q: str = Query(..., min_length=1, max_length=200),
+    category: Optional[str] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """Full-text search over product names and descriptions, best matches first."""
+    key = ("search", q, category, skip, limit)
+    entry = product_list_cache.get(key)
+    if entry is None:
+        products = product_rows(search_products(db, search_backend(), q, category, skip, limit))
+        body = orjson.dumps(products)
+        entry = (body, compute_etag(body))
+        product_list_cache.set(key, entry, product_page_tags(products, is_last_page=False) | {"search"})
+    return conditional_response(*entry, if_none_match)
+
+@router.get("/products/{product_id}", response_model=ProductResponse)
+def read_product(
+    product_id: int,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
     """Get a specific product."""
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if product is None:
-        raise HTTPException(status_code=404, detail="Product not found")
-    return product
-
-@app.post("/orders", response_model=OrderResponse)
-def create_order(order: OrderCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    """Create a new order."""
-    total_amount = 0
-    order_items = []
+    entry = product_cache.get(product_id)
+    if entry is None:
+        row = db.query(*PRODUCT_COLUMNS).filter(Product.id == product_id).first()
+        if row is None:
+            raise HTTPException(status_code=404, detail="Product not found")
+        body = orjson.dumps(product_rows([row])[0])
+        entry = (body, compute_etag(body))
+        product_cache.set(product_id, entry)
+    return conditional_response(*entry, if_none_match)
+
+@router.post("/orders", response_model=OrderResponse)
+def create_order(
+    order: OrderCreate,
+    current_user: User = Depends(get_current_user),
+    claim: IdempotencyClaim = Depends(idempotency_claim),
+    db: Session = Depends(get_db)
+):
+    """Create a new order. Send an Idempotency-Key header to make retries safe."""
+    if claim.replay is not None:
+        return claim.replay
     
-    # Validate products and calculate total
+    # Combine repeated lines for the same product
+    quantities = {}
     for item in order.items:
-        product = db.query(Product).filter(Product.id == item.product_id).first()
+        quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+
+    # Fetch every product in the cart with a single IN (...) query
+    products = {p.id: p for p in db.query(Product).filter(Product.id.in_(quantities)).all()}
+
+    # Validate products and calculate total
+    for product_id, quantity in quantities.items():
+        product = products.get(product_id)
         if not product:
-            raise HTTPException(status_code=404, detail=f"Product {item.product_id} not found")
-        if product.stock_quantity < item.quantity:
-            raise HTTPException(status_code=400, detail=f"Insufficient stock for product {product.name}")
-        
-        item_total = product.price * item.quantity
+            raise HTTPException(status_code=404, detail=f"Product {product_id} not found")
+        if product.stock_quantity < quantity:
+            raise HTTPException(status_code=409, detail=f"Insufficient stock for product {product.name}")
+
+    # Reserve stock for the whole cart in one conditional UPDATE
+    if not reserve_stock(db, quantities):
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Insufficient stock for one or more products")
+
+    total_amount = 0
+    item_rows = []
+    for item in order.items:
+        item_total = products[item.product_id].price * item.quantity
         total_amount += item_total
-        order_items.append({
-            "product": product,
-            "quantity": item.quantity,
-            "price": item_total
-        })
-    
+        item_rows.append({"product_id": item.product_id, "quantity": item.quantity, "price": item_total})
+
     # Create order
-    db_order = Order(
-        user_id=current_user.id,
-        total_amount=total_amount
-    )
+    db_order = Order(user_id=current_user.id, total_amount=total_amount)
     db.add(db_order)
-    db.commit()
-    db.refresh(db_order)
-    
-    # Create order items and update stock
-    for item_data in order_items:
-        db_order_item = OrderItem(
-            order_id=db_order.id,
-            product_id=item_data["product"].id,
-            quantity=item_data["quantity"],
-            price=item_data["price"]
+    db.flush()
+
+    # Insert all order items with one multi-row INSERT ... RETURNING
+    items = []
+    if item_rows:
+        result = db.execute(
+            insert(OrderItem.__table__).values([dict(row, order_id=db_order.id) for row in item_rows]).returning(
+                OrderItem.id, OrderItem.product_id, OrderItem.quantity, OrderItem.price
+            )
         )
-        db.add(db_order_item)
-        
-        # Update product stock
-        item_data["product"].stock_quantity -= item_data["quantity"]
-    
+        items = sorted((OrderItemResponse(**row._mapping) for row in result), key=lambda i: i.id)
+
+    # Build the response from in-memory state instead of refreshing after commit
+    response = OrderResponse(
+        id=db_order.id,
+        user_id=db_order.user_id,
+        total_amount=db_order.total_amount,
+        status=db_order.status,
+        created_at=db_order.created_at,
+        items=items,
+    )
+    claim.record(db, response.model_dump_json().encode())
     db.commit()
+    invalidate_products(quantities)
+
+    logger.info(f"New order created: {response.id} by user {current_user.username}")
+    return response
+
+@router.post("/orders/batch", response_model=OrderBatchResponse)
+def create_orders_batch(
+    batch: OrderBatchCreate,
+    current_user: User = Depends(get_current_user),
+    claim: IdempotencyClaim = Depends(idempotency_claim),
+    db: Session = Depends(get_db)
+):
+    """Create many orders at once; each order succeeds or fails on its own. Supports Idempotency-Key."""
+    if claim.replay is not None:
+        return claim.replay
     
-    # Refresh to get items
-    db.refresh(db_order)
-    
-    logger.info(f"New order created: {db_order.id} by user {current_user.username}")
-    return db_order
+    # Combine repeated lines for the same product within each order
+    carts = []
+    for order in batch.orders:
+        quantities = {}
+        for item in order.items:
+            quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+        carts.append(quantities)
+    product_ids = set().union(*carts)
+
+    for attempt in range(ORDER_BATCH_RESERVE_ATTEMPTS):
+        # Fetch every product in the batch with a single IN (...) query
+        products = {
+            row.id: row for row in db.query(Product.id, Product.name, Product.price, Product.stock_quantity)
+            .filter(Product.id.in_(product_ids))
+        }
+
+        # Allocate stock to orders in request order; orders that don't fit fail on their own
+        available = {product_id: product.stock_quantity for product_id, product in products.items()}
+        errors = {}
+        totals = {}
+        for index, quantities in enumerate(carts):
+            if not quantities:
+                errors[index] = (422, "Order has no items")
+                continue
+            missing = next((product_id for product_id in quantities if product_id not in products), None)
+            if missing is not None:
+                errors[index] = (404, f"Product {missing} not found")
+                continue
+            short = next((product_id for product_id, quantity in quantities.items() if available[product_id] < quantity), None)
+            if short is not None:
+                errors[index] = (409, f"Insufficient stock for product {products[short].name}")
+                continue
+            for product_id, quantity in quantities.items():
+                available[product_id] -= quantity
+                totals[product_id] = totals.get(product_id, 0) + quantity
+
+        # Reserve stock for every accepted order in one conditional UPDATE. If a concurrent
+        # checkout got there first, start over from fresh stock levels.
+        if reserve_stock(db, totals):
+            break
+        db.rollback()
+    else:
+        raise HTTPException(status_code=409, detail="Stock changed concurrently; retry the batch")
+
+    accepted = [index for index in range(len(carts)) if index not in errors]
+    created_at = datetime.utcnow()
+    order_rows = []
+    for index in accepted:
+        total_amount = sum(products[item.product_id].price * item.quantity for item in batch.orders[index].items)
+        order_rows.append({"user_id": current_user.id, "total_amount": total_amount,
+                           "status": "pending", "created_at": created_at})
+
+    # Ids are assigned up front so each table takes one executemany INSERT without RETURNING;
+    # SQLite can't match RETURNING rows to parameters and would fall back to a statement per row
+    order_ids = allocate_ids(db, Order.__table__, len(order_rows))
+    for order_id, row in zip(order_ids, order_rows):
+        row["id"] = order_id
+    item_rows = []
+    for order_id, index in zip(order_ids, accepted):
+        for item in batch.orders[index].items:
+            item_rows.append({"order_id": order_id, "product_id": item.product_id, "quantity": item.quantity,
+                              "price": products[item.product_id].price * item.quantity})
+    item_ids = allocate_ids(db, OrderItem.__table__, len(item_rows))
+    for item_id, row in zip(item_ids, item_rows):
+        row["id"] = item_id
+    if order_rows:
+        db.execute(insert(Order.__table__), order_rows)
+    if item_rows:
+        db.execute(insert(OrderItem.__table__), item_rows)
+
+    results = [None] * len(carts)
+    for index, (status_code, detail) in errors.items():
+        results[index] = {"index": index, "status_code": status_code, "order": None, "error": detail}
+    item_position = 0
+    for order_id, index, row in zip(order_ids, accepted, order_rows):
+        items = []
+        for item in batch.orders[index].items:
+            item_row = item_rows[item_position]
+            items.append({"id": item_ids[item_position], "product_id": item_row["product_id"],
+                          "quantity": item_row["quantity"], "price": item_row["price"]})
+            item_position += 1
+        order = {"id": order_id, **row, "items": items}
+        results[index] = {"index": index, "status_code": 201, "order": order, "error": None}
+
+    body = orjson.dumps({"created": len(accepted), "failed": len(errors), "results": results})
+    claim.record(db, body)
+    db.commit()
+    invalidate_products(totals)
+
+    logger.info(f"Order batch by user {current_user.username}: {len(accepted)} created, {len(errors)} failed")
+    return Response(content=body, media_type="application/json")
 
-@app.get("/orders", response_model=List[OrderResponse])
+@router.get("/orders", response_model=List[OrderResponse])
 def read_user_orders(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    """Get current user's orders."""
-    orders = db.query(Order).filter(Order.user_id == current_user.id).all()
-    return orders
+    """Get current user's orders, newest first."""
+    orders = db.query(Order).options(selectinload(Order.items)).filter(
+        Order.user_id == current_user.id
+    ).order_by(Order.created_at.desc(), Order.id.desc()).all()
+    return Response(content=orjson.dumps([order_row(order) for order in orders]), media_type="application/json")
+
+@router.get("/orders/page", response_model=OrderPage)
+def read_user_orders_page(
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get current user's orders newest first with keyset pagination; pass `next_cursor` back for more."""
+    query = db.query(Order).options(selectinload(Order.items)).filter(Order.user_id == current_user.id)
+    if cursor:
+        position = decode_cursor(cursor)
+        try:
+            created_at = datetime.fromisoformat(position["created_at"])
+            order_id = int(position["id"])
+        except (KeyError, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.filter(tuple_(Order.created_at, Order.id) < (created_at, order_id))
+
+    # Fetch one extra row to know whether another page exists
+    orders = query.order_by(Order.created_at.desc(), Order.id.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(orders) > limit:
+        orders = orders[:limit]
+        next_cursor = encode_cursor({"created_at": orders[-1].created_at.isoformat(), "id": orders[-1].id})
+    body = {"items": [order_row(order) for order in orders], "next_cursor": next_cursor}
+    return Response(content=orjson.dumps(body), media_type="application/json")
 
-@app.get("/orders/{order_id}", response_model=OrderResponse)
+@router.get("/orders/{order_id}", response_model=OrderResponse)
 def read_order(order_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     """Get a specific order."""
     order = db.query(Order).filter(
@@ -385,6 +1080,71 @@ def read_order(order_id: int, current_user: User = Depends(get_current_user), db
         raise HTTPException(status_code=404, detail="Order not found")
     return order
 
+# Streaming exports read through a server-side cursor on their own connection, since the
+# response body is produced after the request's dependencies have finished.
+def export_response(chunks, name: str, format: str):
+    return StreamingResponse(chunks, media_type=EXPORT_MEDIA_TYPES[format], headers={
+        "Content-Disposition": f'attachment; filename="{name}.{format}"'
+    })
+
+@router.get("/export/products")
+def export_products(format: str = Query("ndjson", pattern="^(ndjson|csv)$")):
+    """Stream the whole catalog as NDJSON or CSV."""
+    statement = select(*PRODUCT_COLUMNS).order_by(Product.id)
+    return export_response(stream_rows(engine, statement, PRODUCT_FIELDS, format), "products", format)
+
+@router.get("/export/orders")
+def export_orders(format: str = Query("ndjson", pattern="^(ndjson|csv)$"), current_user: User = Depends(get_current_user)):
+    """Stream the current user's orders with their items as NDJSON (nested) or CSV (one line per item)."""
+    statement = select(
+        Order.id, Order.user_id, Order.total_amount, Order.status, Order.created_at,
+        OrderItem.id, OrderItem.product_id, OrderItem.quantity, OrderItem.price,
+    ).outerjoin(OrderItem, OrderItem.order_id == Order.id).where(
+        Order.user_id == current_user.id
+    ).order_by(Order.id, OrderItem.id)
+    return export_response(stream_orders(engine, statement, format), "orders", format)
+
+def create_app(
+    title: str = "E-commerce API",
+    description: str = "A production-ready e-commerce API deployed on Render",
+    version: str = "1.0.0",
+    json_root: bool = True
+) -> FastAPI:
+    """Build an app serving the API with its middleware and startup/shutdown hooks.
+
+    Each call returns a new app, so app.py can leave out the JSON root and add its own
+    routes without changing this module's `app`.
+    """
+    app = FastAPI(title=title, description=description, version=version)
+
+    # CORS middleware
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # gzip/brotli compression for responses above COMPRESSION_MIN_SIZE bytes
+    app.add_middleware(CompressionMiddleware)
+
+    # Query count and DB time per request in a Server-Timing header, slow query and N+1 warnings
+    app.add_middleware(sql_trace.QueryTraceMiddleware)
+
+    # Request counts and latency for /metrics; added last so it times the other middleware too
+    app.add_middleware(metrics.MetricsMiddleware)
+
+    app.on_event("startup")(prepare_database)
+    app.on_event("shutdown")(stop_password_workers)
+    if json_root:
+        app.add_api_route("/", read_root, methods=["GET"])
+    app.include_router(router)
+    return app
+
+# FastAPI app
+app = create_app()
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8000))
     uvicorn.run(app, host="0.0.0.0", port=port)
@@ -0,0 +1,179 @@
+"""
+Prometheus metrics
+A pure ASGI middleware that counts requests and records their latency by
+method, route template and status code, plus an in-flight gauge. Series are
+plain counters updated on the event loop (no locks, no per-request allocation
+beyond a closure); the text exposition format is only built when /metrics is
+scraped, where registered collectors add gauges such as DB pool and cache stats.
+
+Counters are per process: with several uvicorn workers each one reports its own.
+"""
+from bisect import bisect_left
+from time import perf_counter
+from starlette.responses import Response
+from starlette.routing import Mount
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Upper bounds in seconds; the last bucket (+Inf) is implicit
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UNMATCHED_ROUTE = "unmatched"
+# Set on the scope by the outermost middleware so a mounted app's middleware doesn't count twice
+SCOPE_KEY = "metrics.timed"
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(**labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(int(value))
+
+def metric(name, kind, help_text, samples):
+    """Exposition lines for one metric family; samples are (labels dict, value) pairs."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        lines.append(f"{name}{_labels(**labels)} {_number(value)}")
+    return lines
+
+class _Series:
+    __slots__ = ("buckets", "total")
+
+    def __init__(self, size):
+        self.buckets = [0] * size  # non-cumulative; summed up when rendered
+        self.total = 0.0
+
+class MetricsRegistry:
+    """Request counters and latency histograms plus scrape-time collectors."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.bucket_bounds = tuple(buckets)
+        self.series = {}
+        self.in_flight = 0
+        self.collectors = []
+
+    def observe(self, method, route, status_code, seconds):
+        key = (method, route, status_code)
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = _Series(len(self.bucket_bounds) + 1)
+        series.buckets[bisect_left(self.bucket_bounds, seconds)] += 1
+        series.total += seconds
+
+    def add_collector(self, collector):
+        """Register a callable returning exposition lines, run on every scrape."""
+        self.collectors.append(collector)
+        return collector
+
+    def render(self) -> str:
+        series = sorted(self.series.items())
+        requests = []
+        histogram = [
+            "# HELP http_request_duration_seconds Request latency by route template and status code",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        bounds = [_number(bound) for bound in self.bucket_bounds] + ["+Inf"]
+        for (method, route, status_code), data in series:
+            labels = {"method": method, "route": route, "status": status_code}
+            count = 0
+            for bound, observed in zip(bounds, data.buckets):
+                count += observed
+                histogram.append(
+                    f"http_request_duration_seconds_bucket{_labels(**labels, le=bound)} {count}"
+                )
+            histogram.append(f"http_request_duration_seconds_sum{_labels(**labels)} {_number(data.total)}")
+            histogram.append(f"http_request_duration_seconds_count{_labels(**labels)} {count}")
+            requests.append((labels, count))
+
+        lines = metric("http_requests_total", "counter", "Requests by route template and status code", requests)
+        lines += histogram
+        lines += metric("http_requests_in_flight", "gauge", "Requests currently being handled", [({}, self.in_flight)])
+        for collector in self.collectors:
+            lines += collector()
+        return "\n".join(lines) + "\n"
+
+# Shared by every app in the process, so a mounted app's /metrics shows the same numbers
+REGISTRY = MetricsRegistry()
+
+def metrics_response(registry: MetricsRegistry = REGISTRY) -> Response:
+    return Response(content=registry.render(), media_type=CONTENT_TYPE)
+
+def route_template(scope, root_path=""):
+    """The matched route's path template, including the prefix of any mounts below `root_path`."""
+    route = scope.get("route")
+    if route is None or isinstance(route, Mount):
+        return UNMATCHED_ROUTE
+    return scope.get("root_path", "")[len(root_path):] + route.path
+
+class MetricsMiddleware:
+    """Count and time HTTP requests; add it last so it wraps the other middleware."""
+
+    def __init__(self, app, registry: MetricsRegistry = REGISTRY):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or SCOPE_KEY in scope:
+            await self.app(scope, receive, send)
+            return
+        scope[SCOPE_KEY] = True
+        registry = self.registry
+        root_path = scope.get("root_path", "")
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        registry.in_flight += 1
+        start = perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            registry.in_flight -= 1
+            registry.observe(scope["method"], route_template(scope, root_path), status_code, perf_counter() - start)
+
+def pool_metrics(status: dict):
+    """Exposition lines for a db_pool.pool_status() report."""
+    gauges = (
+        ("db_pool_size", "size", "Configured pool size"),
+        ("db_pool_checked_out", "checked_out", "Connections currently checked out"),
+        ("db_pool_checked_in", "checked_in", "Idle connections in the pool"),
+        ("db_pool_overflow", "overflow", "Overflow connections currently open"),
+        ("db_pool_max_overflow", "max_overflow", "Configured maximum overflow"),
+    )
+    counters = (
+        ("db_pool_checkouts_total", "checkouts", "Successful connection checkouts"),
+        ("db_pool_timeouts_total", "timeouts", "Checkouts that timed out waiting for a connection"),
+        ("db_pool_wait_seconds_total", "wait_seconds_total", "Time spent waiting for a connection"),
+    )
+    lines = []
+    for kind, definitions in (("gauge", gauges), ("counter", counters)):
+        for name, key, help_text in definitions:
+            if key in status:
+                lines += metric(name, kind, help_text, [({}, status[key])])
+    if "wait_seconds_max" in status:
+        lines += metric("db_pool_wait_seconds_max", "gauge", "Longest checkout wait", [({}, status["wait_seconds_max"])])
+    return lines
+
+def cache_metrics(caches: dict):
+    """Exposition lines for named cache.TTLCache instances."""
+    stats = {name: cache.stats() for name, cache in caches.items()}
+    families = (
+        ("cache_hits_total", "counter", "hits", "Cache lookups that found a fresh entry"),
+        ("cache_misses_total", "counter", "misses", "Cache lookups that found nothing or an expired entry"),
+        ("cache_evictions_total", "counter", "evictions", "Entries evicted to stay within maxsize"),
+        ("cache_expirations_total", "counter", "expirations", "Entries dropped after their TTL"),
+        ("cache_invalidations_total", "counter", "invalidations", "Entries dropped by invalidation"),
+        ("cache_hit_ratio", "gauge", "hit_ratio", "Hits over lookups since start"),
+        ("cache_entries", "gauge", "size", "Entries currently cached"),
+        ("cache_max_entries", "gauge", "maxsize", "Configured maximum entries"),
+    )
+    lines = []
+    for name, kind, key, help_text in families:
+        lines += metric(name, kind, help_text, [({"cache": cache}, values[key]) for cache, values in stats.items()])
+    return lines
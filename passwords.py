@@ -0,0 +1,162 @@
+"""
+Password hashing
+scrypt with a per-password salt, run in a small dedicated process pool so the
+KDF's CPU time never occupies the request threadpool or the event loop. Legacy
+unsalted SHA-256 hashes still verify and are reported by needs_rehash() so
+they can be upgraded on the next successful login.
+
+Stored format: scrypt$<n>$<r>$<p>$<salt b64>$<hash b64>
+"""
+import asyncio
+import base64
+import hashlib
+import hmac
+import multiprocessing
+import os
+import secrets
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from anyio import to_thread
+
+def _default_workers():
+    # CPUs this process may run on (a container's cpuset, not the host's count), halved and
+    # capped: each worker is a full interpreter plus 16 MiB of scrypt memory per hash
+    usable = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 2)
+    return min(max(1, usable // 2), 4)
+
+# Environment variables
+# 0 workers hashes in the calling thread (scripts, single-user tools)
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(_default_workers())))
+# Workers run at lower CPU priority so a login storm cannot starve request handling
+PASSWORD_HASH_NICE = int(os.getenv("PASSWORD_HASH_NICE", "10"))
+SCRYPT_N = int(os.getenv("PASSWORD_SCRYPT_N", str(2 ** 14)))
+SCRYPT_R = int(os.getenv("PASSWORD_SCRYPT_R", "8"))
+SCRYPT_P = int(os.getenv("PASSWORD_SCRYPT_P", "1"))
+
+SCHEME = "scrypt"
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def _b64encode(data: bytes) -> str:
+    return base64.b64encode(data).decode().rstrip("=")
+
+def _b64decode(data: str) -> bytes:
+    return base64.b64decode(data + "=" * (-len(data) % 4))
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    # scrypt needs 128 * n * r bytes; leave headroom over hashlib's 32 MiB default
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                          maxmem=256 * n * r + 2 ** 20, dklen=KEY_BYTES)
+
+def _hash(password: str, n: int, r: int, p: int) -> str:
+    salt = secrets.token_bytes(SALT_BYTES)
+    key = _scrypt(password, salt, n, r, p)
+    return f"{SCHEME}${n}${r}${p}${_b64encode(salt)}${_b64encode(key)}"
+
+def _verify(password: str, hashed_password: str) -> bool:
+    if not hashed_password.startswith(SCHEME + "$"):
+        # Legacy unsalted SHA-256 hex digest
+        legacy = hashlib.sha256(password.encode()).hexdigest()
+        return hmac.compare_digest(legacy, hashed_password)
+    try:
+        _, n, r, p, salt, key = hashed_password.split("$")
+        expected = _b64decode(key)
+        actual = _scrypt(password, _b64decode(salt), int(n), int(r), int(p))
+    except ValueError:
+        return False
+    return hmac.compare_digest(actual, expected)
+
+def _init_worker(niceness):
+    if niceness and hasattr(os, "nice"):  # no os.nice on Windows
+        os.nice(niceness)
+
+def get_executor():
+    """The shared hashing pool, started on first use; None when PASSWORD_HASH_WORKERS=0."""
+    global _executor
+    if PASSWORD_HASH_WORKERS <= 0:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            # spawn, not fork: the server process has threads (threadpool, DB pool)
+            _executor = ProcessPoolExecutor(
+                max_workers=PASSWORD_HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(PASSWORD_HASH_NICE,),
+            )
+        return _executor
+
+def _discard(executor):
+    """Drop a pool whose worker died (OOM, kill); the next call starts a fresh one."""
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+def _call(func, *args):
+    # A broken pool fails every submission; replace it and retry once
+    for attempt in range(2):
+        executor = get_executor()
+        if executor is None:
+            return func(*args)
+        try:
+            return executor.submit(func, *args).result()
+        except BrokenProcessPool:
+            _discard(executor)
+            if attempt:
+                raise
+
+def shutdown():
+    """Stop the hashing pool, dropping queued work (it is restarted on next use)."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True, cancel_futures=True)
+            _executor = None
+
+def needs_rehash(hashed_password: str) -> bool:
+    """True for legacy SHA-256 hashes and scrypt hashes below the current work factor."""
+    if not hashed_password.startswith(SCHEME + "$"):
+        return True
+    try:
+        _, n, r, p, _salt, _key = hashed_password.split("$")
+        return (int(n), int(r), int(p)) != (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    except ValueError:
+        return True
+
+def hash_password(password: str) -> str:
+    """Hash a password for storing, blocking until the pool returns."""
+    return _call(_hash, password, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password against its hash, blocking until the pool returns."""
+    if not hashed_password.startswith(SCHEME + "$"):
+        return _verify(plain_password, hashed_password)  # cheap, no need for the pool
+    return _call(_verify, plain_password, hashed_password)
+
+async def _run(func, *args):
+    for attempt in range(2):
+        executor = get_executor()
+        if executor is None:
+            return await to_thread.run_sync(func, *args)
+        try:
+            return await asyncio.wrap_future(executor.submit(func, *args))
+        except BrokenProcessPool:
+            _discard(executor)
+            if attempt:
+                raise
+
+async def hash_password_async(password: str) -> str:
+    """Hash a password without holding a thread while the KDF runs."""
+    return await _run(_hash, password, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password without holding a thread while the KDF runs."""
+    if not hashed_password.startswith(SCHEME + "$"):
+        return _verify(plain_password, hashed_password)
+    return await _run(_verify, plain_password, hashed_password)
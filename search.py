@@ -0,0 +1,135 @@
+"""
+Full-text product search
+SQLite uses an FTS5 external-content table kept in sync with `products` by
+triggers; PostgreSQL uses a GIN index over a to_tsvector() expression. Other
+databases (or SQLite builds without FTS5) fall back to LIKE matching.
+"""
+import logging
+import re
+from contextlib import contextmanager
+from sqlalchemy import text, Integer, String, Float, DateTime
+from sqlalchemy.exc import OperationalError
+
+logger = logging.getLogger(__name__)
+
+# Must match the expression in the GIN index exactly for PostgreSQL to use it
+PG_SEARCH_VECTOR = "to_tsvector('english', coalesce(products.name, '') || ' ' || coalesce(products.description, ''))"
+
+SQLITE_FTS_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS products_fts
+       USING fts5(name, description, content='products', content_rowid='id')""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+         INSERT INTO products_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+         INSERT INTO products_fts(products_fts, rowid, name, description)
+         VALUES ('delete', old.id, old.name, old.description);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name, description ON products BEGIN
+         INSERT INTO products_fts(products_fts, rowid, name, description)
+         VALUES ('delete', old.id, old.name, old.description);
+         INSERT INTO products_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+       END""",
+]
+
+PG_SEARCH_DDL = f"CREATE INDEX IF NOT EXISTS ix_products_search ON products USING GIN ({PG_SEARCH_VECTOR})"
+
+# Part of main.schema_fingerprint(), so changing the DDL triggers a migration
+SEARCH_DDL = SQLITE_FTS_DDL + [PG_SEARCH_DDL]
+
+# Typed result columns so SQLite's stored timestamps come back as datetimes
+RESULT_TYPES = dict(id=Integer, name=String, description=String, price=Float,
+                    stock_quantity=Integer, category=String, created_at=DateTime)
+
+PRODUCT_SELECT = """SELECT products.id, products.name, products.description, products.price,
+       products.stock_quantity, products.category, products.created_at"""
+
+def ensure_search_index(engine):
+    """Create the full-text index for the engine's dialect; return the backend name."""
+    dialect = engine.dialect.name
+    if dialect == "postgresql":
+        with engine.begin() as conn:
+            conn.execute(text(PG_SEARCH_DDL))
+        return "postgresql"
+    if dialect == "sqlite":
+        try:
+            with engine.begin() as conn:
+                exists = conn.execute(text(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'products_fts'"
+                )).first()
+                for statement in SQLITE_FTS_DDL:
+                    conn.execute(text(statement))
+                if not exists:
+                    # Index the rows that were there before the triggers existed
+                    conn.execute(text("INSERT INTO products_fts(products_fts) VALUES ('rebuild')"))
+            return "fts5"
+        except OperationalError as e:
+            logger.warning(f"FTS5 unavailable, product search falls back to LIKE: {e}")
+    return "like"
+
+def detect_search_backend(engine):
+    """The backend ensure_search_index set up for this database, without changing anything."""
+    dialect = engine.dialect.name
+    if dialect == "postgresql":
+        return "postgresql"
+    if dialect == "sqlite":
+        with engine.connect() as conn:
+            if conn.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'products_fts'"
+            )).first():
+                return "fts5"
+    return "like"
+
+@contextmanager
+def deferred_search_index(engine):
+    """For bulk loads: drop the SQLite FTS insert trigger and rebuild the index once at the end."""
+    if engine.dialect.name != "sqlite":
+        yield
+        return
+    with engine.begin() as conn:
+        has_fts = conn.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'products_fts'"
+        )).first()
+        if has_fts:
+            conn.execute(text("DROP TRIGGER IF EXISTS products_fts_ai"))
+    try:
+        yield
+    finally:
+        if has_fts:
+            with engine.begin() as conn:
+                conn.execute(text(SQLITE_FTS_DDL[1]))
+                conn.execute(text("INSERT INTO products_fts(products_fts) VALUES ('rebuild')"))
+
+def _fts5_query(q):
+    """Quote each word as a prefix term so user input can't break MATCH syntax."""
+    return " ".join(f'"{word}"*' for word in re.findall(r"\w+", q))
+
+def search_products(db, backend, q, category=None, skip=0, limit=20):
+    """Return ranked product rows (id, name, description, price, stock_quantity, category, created_at)."""
+    params = {"limit": limit, "skip": skip, "category": category}
+    category_clause = "AND products.category = :category" if category is not None else ""
+
+    if backend == "fts5":
+        params["q"] = _fts5_query(q)
+        if not params["q"]:
+            return []
+        sql = f"""{PRODUCT_SELECT}
+            FROM products_fts JOIN products ON products.id = products_fts.rowid
+            WHERE products_fts MATCH :q {category_clause}
+            ORDER BY bm25(products_fts), products.id
+            LIMIT :limit OFFSET :skip"""
+    elif backend == "postgresql":
+        params["q"] = q
+        sql = f"""{PRODUCT_SELECT}
+            FROM products, websearch_to_tsquery('english', :q) AS query
+            WHERE {PG_SEARCH_VECTOR} @@ query {category_clause}
+            ORDER BY ts_rank({PG_SEARCH_VECTOR}, query) DESC, products.id
+            LIMIT :limit OFFSET :skip"""
+    else:
+        params["q"] = f"%{q}%"
+        sql = f"""{PRODUCT_SELECT}
+            FROM products
+            WHERE (products.name LIKE :q OR products.description LIKE :q) {category_clause}
+            ORDER BY products.id
+            LIMIT :limit OFFSET :skip"""
+    return db.execute(text(sql).columns(**RESULT_TYPES), params).all()
@@ -0,0 +1,112 @@
+"""
+Per-request SQL instrumentation
+Engine events time every statement; a pure ASGI middleware gives each request
+a QueryTrace through a context variable (copied into threadpool workers, so
+sync routes and dependencies are covered) and reports its query count and DB
+time in a Server-Timing header. Statements slower than SQL_SLOW_QUERY_MS are
+logged with the shape of their bind parameters (types, never values), and a
+statement run more than SQL_REPEAT_WARN_THRESHOLD times in one request is
+logged as a likely N+1.
+"""
+import logging
+import os
+import re
+from contextvars import ContextVar
+from time import perf_counter
+from sqlalchemy import event
+
+# Environment variables
+SQL_SLOW_QUERY_MS = float(os.getenv("SQL_SLOW_QUERY_MS", "100"))
+SQL_REPEAT_WARN_THRESHOLD = int(os.getenv("SQL_REPEAT_WARN_THRESHOLD", "10"))
+SQL_SERVER_TIMING = os.getenv("SQL_SERVER_TIMING", "true").lower() in ("1", "true", "yes")
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar("sql_trace", default=None)
+_whitespace = re.compile(r"\s+")
+
+class QueryTrace:
+    """Statements run while handling one request."""
+
+    __slots__ = ("path", "count", "seconds", "repeats", "warned")
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self.seconds = 0.0
+        self.repeats = {}
+        self.warned = set()
+
+    def record(self, statement: str, seconds: float):
+        self.count += 1
+        self.seconds += seconds
+        repeats = self.repeats[statement] = self.repeats.get(statement, 0) + 1
+        if repeats > SQL_REPEAT_WARN_THRESHOLD and statement not in self.warned:
+            self.warned.add(statement)
+            logger.warning(f"Possible N+1 in {self.path}: statement ran more than "
+                           f"{SQL_REPEAT_WARN_THRESHOLD} times: {_one_line(statement)}")
+
+    def server_timing(self) -> bytes:
+        return f'db;dur={self.seconds * 1000:.3f};desc="{self.count} queries"'.encode()
+
+def current_trace():
+    """The QueryTrace of the request being handled, or None outside a request."""
+    return _current.get()
+
+def _one_line(statement: str, limit: int = 500) -> str:
+    statement = _whitespace.sub(" ", statement).strip()
+    return statement if len(statement) <= limit else statement[:limit] + "..."
+
+def bind_shape(parameters, executemany=False) -> str:
+    """Describe bind parameters by type only, e.g. "3 x {'name': str, 'price': float}"."""
+    if executemany:
+        rows = list(parameters or ())
+        return f"{len(rows)} x {bind_shape(rows[0]) if rows else '[]'}"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{key!r}: {type(value).__name__}" for key, value in parameters.items()) + "}"
+    if isinstance(parameters, (list, tuple)):
+        return "(" + ", ".join(type(value).__name__ for value in parameters) + ")"
+    return type(parameters).__name__
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context.sql_trace_start = perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    seconds = perf_counter() - context.sql_trace_start
+    trace = _current.get()
+    if trace is not None:
+        trace.record(statement, seconds)
+    if seconds * 1000 >= SQL_SLOW_QUERY_MS:
+        where = f" in {trace.path}" if trace is not None else ""
+        logger.warning(f"Slow query{where} ({seconds * 1000:.1f} ms): {_one_line(statement)} "
+                       f"binds={bind_shape(parameters, executemany)}")
+
+def instrument(engine):
+    """Time every statement the engine runs."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+class QueryTraceMiddleware:
+    """Trace each HTTP request's statements and add a Server-Timing header."""
+
+    def __init__(self, app, server_timing: bool = SQL_SERVER_TIMING):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        trace = QueryTrace(scope["path"])
+        token = _current.set(trace)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start" and self.server_timing:
+                # Statements run while a streamed body is produced come after the header
+                message["headers"] = list(message.get("headers", ())) + [(b"server-timing", trace.server_timing())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
@@ -11,7 +11,9 @@ from fastapi.responses import RedirectResponse
 import uvicorn
 
 # Import your existing FastAPI app
-from main import app as fastapi_app
+from main import app as fastapi_app, prepare_database, stop_password_workers
+from compression import CompressionMiddleware
+import metrics
 
 # Create a new unified app
 app = FastAPI(
@@ -20,9 +22,25 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# gzip/brotli compression; responses from the mounted API are already compressed and pass through
+app.add_middleware(CompressionMiddleware)
+
+# Times every request, including those handled by the mounted API, whose own
+# MetricsMiddleware then steps aside; route labels keep the /api prefix
+app.add_middleware(metrics.MetricsMiddleware)
+
 # Mount the existing FastAPI app
 app.mount("/api", fastapi_app)
 
+# Mounted apps get no lifespan events, so run the API's startup and shutdown work here
+@app.on_event("startup")
+async def start_api():
+    await prepare_database()
+
+@app.on_event("shutdown")
+def stop_api():
+    stop_password_workers()
+
 def run_streamlit():
     """Run Streamlit in a separate thread"""
     try:
@@ -65,6 +83,11 @@ def health_check():
         "timestamp": time.time()
     }
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus text exposition of request, DB pool and cache metrics."""
+    return metrics.metrics_response()
+
 if __name__ == "__main__":
     # Start Streamlit in background thread
     streamlit_thread = threading.Thread(target=run_streamlit, daemon=True)